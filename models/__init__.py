@@ -11,6 +11,11 @@ from . import ai_analyst_gateway
 from . import ai_analyst_dimension
 from . import res_config_settings
 from . import res_users
+from . import sale_order
+from . import sale_order_line
+from . import pos_order
+from . import account_move
+from . import ai_analyst_sale_daily_summary
 from . import boss_open_query
 from . import schema_registry
 from . import field_relevance
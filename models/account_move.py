@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from odoo import models
+from odoo.tools import create_index
+
+
+class AccountMove(models.Model):
+    _inherit = 'account.move'
+
+    def init(self):
+        super().init()
+        # Freshness stamp of the cached analytics tools (MAX(write_date)
+        # of the company): an index top-1 lookup instead of a table scan
+        create_index(
+            self._cr,
+            'account_move_company_id_write_date_index',
+            self._table,
+            ['company_id', 'write_date'],
+        )
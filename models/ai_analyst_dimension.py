@@ -1,5 +1,13 @@
 # -*- coding: utf-8 -*-
-from odoo import api, fields, models
+import re
+
+from odoo import api, fields, models, tools
+from odoo.exceptions import ValidationError
+
+from ..tools import config_cache
+
+# Regex synonyms are matched against user input on every lookup
+MAX_SYNONYM_REGEX_LENGTH = 200
 
 
 class AiAnalystDimension(models.Model):
@@ -50,6 +58,19 @@ class AiAnalystDimension(models.Model):
             if values:
                 rec.write(values)
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        config_cache.invalidate()
+        return super().create(vals_list)
+
+    def write(self, vals):
+        config_cache.invalidate()
+        return super().write(vals)
+
+    def unlink(self):
+        config_cache.invalidate()
+        return super().unlink()
+
     _sql_constraints = [
         ('ai_analyst_dimension_code_uniq', 'unique(code, company_id)', 'Dimension code must be unique per company.'),
     ]
@@ -83,6 +104,31 @@ class AiAnalystDimensionSynonym(models.Model):
         readonly=True,
     )
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        config_cache.invalidate()
+        return super().create(vals_list)
+
+    def write(self, vals):
+        config_cache.invalidate()
+        return super().write(vals)
+
+    def unlink(self):
+        config_cache.invalidate()
+        return super().unlink()
+
+    @api.constrains('synonym', 'match_type')
+    def _check_regex_synonym(self):
+        for rec in self.filtered(lambda s: s.match_type == 'regex'):
+            if len(rec.synonym or '') > MAX_SYNONYM_REGEX_LENGTH:
+                raise ValidationError(
+                    f'Regex synonyms are limited to {MAX_SYNONYM_REGEX_LENGTH} characters.'
+                )
+            try:
+                re.compile(rec.synonym or '')
+            except re.error as e:
+                raise ValidationError(f'Invalid regex synonym "{rec.synonym}": {e}') from e
+
     _sql_constraints = [
         ('ai_analyst_dimension_synonym_uniq', 'unique(dimension_id, synonym, canonical_value, match_type)', 'Duplicate synonym mapping is not allowed.'),
     ]
@@ -111,6 +157,53 @@ class AiAnalystSeasonConfig(models.Model):
         ('ai_analyst_season_config_code_uniq', 'unique(code, company_id)', 'Season code must be unique per company.'),
     ]
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        res = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return res
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
+
+    @api.model
+    @tools.ormcache('season_id')
+    def _compiled_tag_patterns(self, season_id):
+        """Return ``(exact_values, ilike_patterns)`` matching the season's tags.
+
+        ``exact_values`` are lowercased wildcard-free exact patterns, to be
+        compared with ``lower(field)``; every other pattern is turned into
+        an ``ILIKE`` pattern. A season without active patterns matches its
+        own code. Cached until a season or pattern is edited.
+        """
+        season = self.browse(season_id)
+        patterns = season.tag_pattern_ids.filtered(lambda p: p.is_active)
+        if not patterns:
+            return (), (season.code,)
+        exacts, ilikes = [], []
+        for p in patterns:
+            pattern = p.pattern
+            if p.match_type == 'exact':
+                if '%' in pattern or '_' in pattern:
+                    ilikes.append(pattern)
+                else:
+                    exacts.append(pattern.lower())
+            elif p.match_type == 'prefix':
+                ilikes.append(f'{pattern}%')
+            elif p.match_type == 'contains':
+                ilikes.append(f'%{pattern}%')
+            else:  # regex fallback: broad ilike guard
+                cleaned = ''.join(ch for ch in pattern if ch.isalnum())
+                ilikes.append(f'%{cleaned or pattern}%')
+        return tuple(dict.fromkeys(exacts)), tuple(dict.fromkeys(ilikes))
+
     @api.model
     def find_by_tag(self, tag_value):
         """Resolve a tag (e.g., AW25) into a configured season code."""
@@ -166,3 +259,19 @@ class AiAnalystSeasonTagPattern(models.Model):
         index=True,
         readonly=True,
     )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        res = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return res
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
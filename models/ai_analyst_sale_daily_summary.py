@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+Sale Daily Summary — confirmed sales pre-aggregated per day.
+==============================================================
+One row per (company, day, product, category, salesperson) holding the
+revenue, quantity and margin of the confirmed order lines of that day.
+Rankings over long date ranges sum these rows instead of every order line.
+
+Rows are maintained by cron:
+- every hour, the dirty days are recomputed (delete + insert per day). A
+  day is dirty when an order dated on it, or one of its lines, was written
+  since the previous refresh, or when it was recorded in
+  ``ai.analyst.sale.daily.summary.dirty``: orders and lines leave no
+  write_date behind when they are deleted, nor on their old day when an
+  order's date or company changes, so those are recorded at write/unlink;
+- every night, the whole table is rebuilt, which also picks up product
+  category changes.
+
+Both runs hold the same advisory lock, and a unique index over the row key
+guarantees overlapping runs never store a row twice.
+
+Readers must check ``is_fresh`` for their range before trusting the rows.
+"""
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.tools import SQL, create_index, create_unique_index
+
+REFRESHED_AT_PARAM = 'ai_analyst.sale_summary_refreshed_at'
+
+# Writes committed late by transactions that started before a refresh may
+# carry an older write_date: dirty checks look back this much further.
+_REFRESH_OVERLAP = timedelta(hours=1)
+
+# pg_advisory_xact_lock key serializing summary refreshes
+_REFRESH_LOCK = 0x41415344  # 'AASD'
+
+
+class AiAnalystSaleDailySummary(models.Model):
+    _name = 'ai.analyst.sale.daily.summary'
+    _description = 'AI Analyst Sale Daily Summary'
+    _order = 'date desc, id'
+    _log_access = False
+
+    date = fields.Date(required=True, readonly=True)
+    company_id = fields.Many2one('res.company', required=True, readonly=True, ondelete='cascade')
+    product_id = fields.Many2one('product.product', readonly=True, ondelete='cascade')
+    categ_id = fields.Many2one('product.category', readonly=True, ondelete='set null')
+    salesman_id = fields.Many2one('res.users', readonly=True, ondelete='set null')
+    revenue = fields.Float(readonly=True)
+    quantity = fields.Float(readonly=True)
+    margin = fields.Float(readonly=True)
+
+    def init(self):
+        super().init()
+        create_index(
+            self._cr,
+            'ai_analyst_sale_daily_summary_company_id_date_index',
+            self._table,
+            ['company_id', 'date'],
+        )
+        # One row per key; empty many2ones count as equal
+        create_unique_index(
+            self._cr,
+            'ai_analyst_sale_daily_summary_key_uniq',
+            self._table,
+            ['date', 'company_id', 'COALESCE(product_id, 0)',
+             'COALESCE(categ_id, 0)', 'COALESCE(salesman_id, 0)'],
+        )
+
+    @api.model
+    def _refreshed_at(self):
+        """Return the datetime of the last refresh, or ``None`` if never built."""
+        value = self.env['ir.config_parameter'].sudo().get_param(REFRESHED_AT_PARAM)
+        return fields.Datetime.to_datetime(value) if value else None
+
+    @api.model
+    def _mark_dirty(self, orders):
+        """Record the days of ``orders`` as dirty, before they are deleted or moved."""
+        days = {
+            (order.company_id.id, order.date_order.date())
+            for order in orders.sudo()
+            if order.company_id and order.date_order
+        }
+        if days:
+            company_ids, dates = (list(column) for column in zip(*days))
+            self.env.cr.execute(SQL(
+                """
+                INSERT INTO %s (company_id, date)
+                SELECT * FROM unnest(%s::int[], %s::date[])
+                ON CONFLICT DO NOTHING
+                """,
+                SQL.identifier(self.env['ai.analyst.sale.daily.summary.dirty']._table),
+                company_ids, dates,
+            ))
+
+    @api.model
+    def is_fresh(self, company_id, dt_from, dt_end):
+        """Return whether the rows can stand for ``[dt_from, dt_end)`` of ``company_id``.
+
+        The summary is stale for the range when an order dated in it, or one
+        of its lines, was written since the last refresh, or when one of its
+        days was marked dirty (deletions, moved orders). The checks are range
+        scans on ``(company_id, date_order)`` and ``(company_id, date)``.
+        """
+        refreshed_at = self._refreshed_at()
+        if not refreshed_at:
+            return False
+        self.env['sale.order'].flush_model()
+        self.env['sale.order.line'].flush_model()
+        self.env.cr.execute(SQL(
+            """
+            SELECT 1
+              FROM sale_order so
+             WHERE so.company_id = %(company_id)s
+               AND so.date_order >= %(dt_from)s AND so.date_order < %(dt_end)s
+               AND (so.write_date >= %(since)s
+                    OR EXISTS(SELECT 1 FROM sale_order_line sol
+                               WHERE sol.order_id = so.id AND sol.write_date >= %(since)s))
+             UNION ALL
+            SELECT 1
+              FROM %(dirty)s
+             WHERE company_id = %(company_id)s
+               AND date >= %(dt_from)s::date AND date < %(dt_end)s::date
+             LIMIT 1
+            """,
+            company_id=company_id, dt_from=dt_from, dt_end=dt_end,
+            since=refreshed_at - _REFRESH_OVERLAP,
+            dirty=SQL.identifier(self.env['ai.analyst.sale.daily.summary.dirty']._table),
+        ))
+        return not self.env.cr.fetchone()
+
+    @api.model
+    def _refresh(self, full=False):
+        """Recompute the rows of the days changed since the last refresh.
+
+        With ``full`` (or when the table was never built), every row is
+        rebuilt instead.
+        """
+        self.env.flush_all()
+        cr = self.env.cr
+        # Overlapping runs (hourly refresh, nightly rebuild) wait for each
+        # other instead of deleting and inserting the same days concurrently
+        cr.execute(SQL('SELECT pg_advisory_xact_lock(%s)', _REFRESH_LOCK))
+        now = cr.now()
+        refreshed_at = self._refreshed_at()
+        dirty_table = SQL.identifier(self.env['ai.analyst.sale.daily.summary.dirty']._table)
+        if full or not refreshed_at:
+            cr.execute(SQL('DELETE FROM %s', dirty_table))
+            cr.execute(SQL('DELETE FROM %s', SQL.identifier(self._table)))
+            days_filter = SQL('TRUE')
+        else:
+            # Spelling out the companies lets both write_date filters
+            # range-scan the (company_id, write_date) indexes
+            company_ids = self.env['res.company'].sudo().with_context(
+                active_test=False,
+            ).search([]).ids
+            cr.execute(SQL(
+                """
+                WITH marked AS (
+                    DELETE FROM %(dirty)s RETURNING company_id, date
+                )
+                SELECT company_id, date FROM marked
+                 UNION
+                SELECT so.company_id, so.date_order::date
+                  FROM sale_order so
+                 WHERE so.company_id = ANY(%(company_ids)s) AND so.write_date >= %(since)s
+                 UNION
+                SELECT so.company_id, so.date_order::date
+                  FROM sale_order_line sol
+                  JOIN sale_order so ON so.id = sol.order_id
+                 WHERE sol.company_id = ANY(%(company_ids)s) AND sol.write_date >= %(since)s
+                """,
+                dirty=dirty_table, since=refreshed_at - _REFRESH_OVERLAP,
+                company_ids=company_ids,
+            ))
+            dirty = cr.fetchall()
+            days_filter = None
+            if dirty:
+                company_ids, days = (list(column) for column in zip(*dirty))
+                dirty_days = SQL(
+                    'SELECT * FROM unnest(%s::int[], %s::date[])', company_ids, days,
+                )
+                cr.execute(SQL(
+                    'DELETE FROM %s WHERE (company_id, date) IN (%s)',
+                    SQL.identifier(self._table), dirty_days,
+                ))
+                days_filter = SQL('(so.company_id, so.date_order::date) IN (%s)', dirty_days)
+
+        if days_filter is not None:
+            margin = (
+                SQL('SUM(sol.margin)') if 'margin' in self.env['sale.order.line']._fields
+                else SQL('0')
+            )
+            cr.execute(SQL(
+                """
+                INSERT INTO %(table)s (date, company_id, product_id, categ_id,
+                                       salesman_id, revenue, quantity, margin)
+                SELECT so.date_order::date, so.company_id, sol.product_id, pt.categ_id,
+                       sol.salesman_id, SUM(sol.price_subtotal), SUM(sol.product_uom_qty),
+                       %(margin)s
+                  FROM sale_order_line sol
+                  JOIN sale_order so ON so.id = sol.order_id
+             LEFT JOIN product_product pp ON pp.id = sol.product_id
+             LEFT JOIN product_template pt ON pt.id = pp.product_tmpl_id
+                 WHERE sol.state IN ('sale', 'done') AND %(days)s
+              GROUP BY 1, 2, 3, 4, 5
+                """,
+                table=SQL.identifier(self._table), margin=margin, days=days_filter,
+            ))
+        self.env['ir.config_parameter'].sudo().set_param(
+            REFRESHED_AT_PARAM, fields.Datetime.to_string(now),
+        )
+        self.invalidate_model()
+
+    @api.model
+    def cron_refresh(self):
+        self._refresh()
+
+    @api.model
+    def cron_rebuild(self):
+        self._refresh(full=True)
+
+
+class AiAnalystSaleDailySummaryDirty(models.Model):
+    _name = 'ai.analyst.sale.daily.summary.dirty'
+    _description = 'AI Analyst Sale Daily Summary Dirty Day'
+    _log_access = False
+
+    company_id = fields.Many2one('res.company', required=True, readonly=True, ondelete='cascade')
+    date = fields.Date(required=True, readonly=True)
+
+    _sql_constraints = [
+        ('company_date_uniq', 'unique(company_id, date)', 'A day is marked dirty once per company.'),
+    ]
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from odoo import models
+from odoo.tools import create_index
+
+
+class SaleOrder(models.Model):
+    _inherit = 'sale.order'
+
+    def init(self):
+        super().init()
+        # The analytics tools filter confirmed orders by company and a
+        # half-open date_order range; this lets Postgres range-scan it.
+        create_index(
+            self._cr,
+            'sale_order_company_id_date_order_index',
+            self._table,
+            ['company_id', 'date_order'],
+        )
+        # Freshness stamp of the cached analytics tools (MAX(write_date)
+        # of the company): an index top-1 lookup instead of a table scan
+        create_index(
+            self._cr,
+            'sale_order_company_id_write_date_index',
+            self._table,
+            ['company_id', 'write_date'],
+        )
+
+    def write(self, vals):
+        if 'date_order' in vals or 'company_id' in vals:
+            # The summary rows of the days the orders leave are recomputed
+            self.env['ai.analyst.sale.daily.summary']._mark_dirty(self)
+        return super().write(vals)
+
+    def unlink(self):
+        self.env['ai.analyst.sale.daily.summary']._mark_dirty(self)
+        return super().unlink()
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from odoo import models
+from odoo.tools import create_index
+
+
+class SaleOrderLine(models.Model):
+    _inherit = 'sale.order.line'
+
+    def init(self):
+        super().init()
+        # Freshness stamp of the cached analytics tools (MAX(write_date)
+        # of the company): an index top-1 lookup instead of a table scan
+        create_index(
+            self._cr,
+            'sale_order_line_company_id_write_date_index',
+            self._table,
+            ['company_id', 'write_date'],
+        )
+
+    def write(self, vals):
+        if 'order_id' in vals:
+            # The summary rows of the days the lines leave are recomputed
+            self.env['ai.analyst.sale.daily.summary']._mark_dirty(self.order_id)
+        return super().write(vals)
+
+    def unlink(self):
+        self.env['ai.analyst.sale.daily.summary']._mark_dirty(self.order_id)
+        return super().unlink()
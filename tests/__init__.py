@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from . import test_tools
+from . import test_sale_daily_summary
 from . import test_gateway
 from . import test_security
 from . import test_dashboard
@@ -104,6 +104,105 @@ class TestDimensionTools(TransactionCase):
         )
         self.assertEqual(resolved, 'Women')
 
+    def test_synonym_resolution_respects_priority(self):
+        from odoo.addons.ai_analyst.tools.registry import get_tool
+        tool = get_tool('get_sales_by_dimension')
+        Synonym = self.env['ai.analyst.dimension.synonym']
+        Synonym.create({
+            'dimension_id': self.dim_gender.id,
+            'synonym': 'wom',
+            'canonical_value': 'Prefix Women',
+            'match_type': 'prefix',
+            'priority': 0,
+        })
+        Synonym.create({
+            'dimension_id': self.dim_gender.id,
+            'synonym': "women's",
+            'canonical_value': 'Exact Women',
+            'match_type': 'exact',
+            'priority': 5,
+        })
+        env = self.env.with_user(self.user)
+        # The prefix synonym outranks both the exact and the contains entries
+        self.assertEqual(tool._resolve_synonym(env, self.dim_gender, "Women's"), 'Prefix Women')
+        self.assertEqual(tool._resolve_synonym(env, self.dim_gender, 'menswear'), 'menswear')
+
+    def test_synonym_resolution_contains_substring(self):
+        from odoo.addons.ai_analyst.tools.registry import get_tool
+        tool = get_tool('get_sales_by_dimension')
+        env = self.env.with_user(self.user)
+        # 'contains' synonyms match anywhere in the value, whatever the case
+        self.assertEqual(tool._resolve_synonym(env, self.dim_category, 'Red SNEAKERS XL'), 'Shoes')
+        self.assertEqual(tool._resolve_synonym(env, self.dim_category, 'sneakers'), 'Shoes')
+        self.assertEqual(tool._resolve_synonym(env, self.dim_category, 'sneaker'), 'sneaker')
+
+    def test_synonym_resolution_overlapping_contains(self):
+        from odoo.addons.ai_analyst.tools.registry import get_tool
+        tool = get_tool('get_sales_by_dimension')
+        Synonym = self.env['ai.analyst.dimension.synonym']
+        Synonym.create({
+            'dimension_id': self.dim_category.id,
+            'synonym': 'sneak',
+            'canonical_value': 'Sneak',
+            'match_type': 'contains',
+            'priority': 2,
+        })
+        Synonym.create({
+            'dimension_id': self.dim_category.id,
+            'synonym': 'kers',
+            'canonical_value': 'Kers',
+            'match_type': 'contains',
+            'priority': 3,
+        })
+        env = self.env.with_user(self.user)
+        # All three terms occur in 'red sneakers': the best priority wins,
+        # not the first term to end in the value
+        self.assertEqual(tool._resolve_synonym(env, self.dim_category, 'red sneakers'), 'Shoes')
+        self.assertEqual(tool._resolve_synonym(env, self.dim_category, 'sneaky boots'), 'Sneak')
+        self.assertEqual(tool._resolve_synonym(env, self.dim_category, 'walkers'), 'Kers')
+
+        # A term ending inside a longer one is still found (suffix link)
+        Synonym.create({
+            'dimension_id': self.dim_category.id,
+            'synonym': 'akers',
+            'canonical_value': 'Akers',
+            'match_type': 'contains',
+            'priority': 0,
+        })
+        self.assertEqual(tool._resolve_synonym(env, self.dim_category, 'red sneakers'), 'Akers')
+
+    def test_synonym_resolution_regex_priority_ties(self):
+        from odoo.addons.ai_analyst.tools.registry import get_tool
+        tool = get_tool('get_sales_by_dimension')
+        Synonym = self.env['ai.analyst.dimension.synonym']
+        Synonym.create({
+            'dimension_id': self.dim_category.id,
+            'synonym': r'snea?kers?',
+            'canonical_value': 'Regex Shoes',
+            'match_type': 'regex',
+            'priority': 1,
+        })
+        Synonym.create({
+            'dimension_id': self.dim_category.id,
+            'synonym': r'^boots?\b',
+            'canonical_value': 'Boots A',
+            'match_type': 'regex',
+            'priority': 4,
+        })
+        Synonym.create({
+            'dimension_id': self.dim_category.id,
+            'synonym': r'bo+ts',
+            'canonical_value': 'Boots B',
+            'match_type': 'regex',
+            'priority': 4,
+        })
+        env = self.env.with_user(self.user)
+        # Equal priorities fall back to creation order, across match types
+        self.assertEqual(tool._resolve_synonym(env, self.dim_category, 'sneakers'), 'Shoes')
+        self.assertEqual(tool._resolve_synonym(env, self.dim_category, 'Snekers'), 'Regex Shoes')
+        self.assertEqual(tool._resolve_synonym(env, self.dim_category, 'Boots XL'), 'Boots A')
+        self.assertEqual(tool._resolve_synonym(env, self.dim_category, 'tall boots'), 'Boots B')
+
     def test_season_pattern_matching(self):
         season = self.env['ai.analyst.season.config'].find_by_tag('AW25')
         self.assertTrue(season)
@@ -121,3 +220,90 @@ class TestDimensionTools(TransactionCase):
         result = tool.execute(self.env.with_user(self.user), self.user, params)
         self.assertIn('rows', result)
         self.assertGreaterEqual(len(result['rows']), 1)
+
+    def test_dimension_grouping_by_inherited_category(self):
+        """Test grouping on product_id.categ_id, inherited from the template."""
+        from odoo.addons.ai_analyst.tools.registry import get_tool
+        tool = get_tool('get_sales_by_dimension')
+        params = {
+            'date_from': (date.today() - timedelta(days=30)).isoformat(),
+            'date_to': date.today().isoformat(),
+            'dimension_codes': ['category_test'],
+        }
+        result = tool.execute(self.env.with_user(self.user), self.user, params)
+        shoes = [row for row in result['rows'] if row['dimensions']['category_test'] == 'Shoes']
+        self.assertEqual(len(shoes), 1)
+        self.assertAlmostEqual(shoes[0]['sales'], 200.0, places=2)
+        self.assertAlmostEqual(shoes[0]['quantity'], 2.0, places=2)
+
+    def test_dimension_filter_on_many2one(self):
+        """Test filtering dimensions whose path ends on a many2one."""
+        from odoo.addons.ai_analyst.tools.registry import get_tool
+        tool = get_tool('get_sales_by_dimension')
+        Dimension = self.env['ai.analyst.dimension']
+        Dimension.create([
+            {
+                'name': 'Category Record',
+                'code': 'category_m2o_test',
+                'model_name': 'sale.order.line',
+                'field_name': 'product_id.categ_id',
+                'company_id': self.user.company_id.id,
+            },
+            {
+                'name': 'Product Record',
+                'code': 'product_m2o_test',
+                'model_name': 'sale.order.line',
+                'field_name': 'product_id',
+                'company_id': self.user.company_id.id,
+            },
+        ])
+        env = self.env.with_user(self.user)
+        for code, value in [
+            ('category_m2o_test', 'shoes'),
+            ('product_m2o_test', 'women aw25 sneakers red'),
+        ]:
+            params = {
+                'date_from': (date.today() - timedelta(days=30)).isoformat(),
+                'date_to': date.today().isoformat(),
+                'dimension_codes': ['gender_test'],
+                'filters': {code: value},
+            }
+            result = tool.execute(env, self.user, params)
+            self.assertEqual(len(result['rows']), 1, code)
+            self.assertAlmostEqual(result['rows'][0]['sales'], 200.0, places=2)
+
+    def test_dimension_grouping_keeps_homonyms_apart(self):
+        """Test two related records sharing a name stay separate groups."""
+        from odoo.addons.ai_analyst.tools.registry import get_tool
+        tool = get_tool('get_sales_by_dimension')
+        self.env['ai.analyst.dimension'].create({
+            'name': 'Customer',
+            'code': 'customer_test',
+            'model_name': 'sale.order.line',
+            'field_name': 'order_id.partner_id',
+            'company_id': self.user.company_id.id,
+        })
+        product = self.env['product.product'].create({'name': 'Homonym Product', 'type': 'consu'})
+        for _i in range(2):
+            order = self.env['sale.order'].create({
+                'partner_id': self.env['res.partner'].create({'name': 'Homonym Customer'}).id,
+                'company_id': self.user.company_id.id,
+                'order_line': [(0, 0, {
+                    'product_id': product.id,
+                    'product_uom_qty': 1,
+                    'price_unit': 30.0,
+                })],
+            })
+            order.action_confirm()
+
+        result = tool.execute(self.env.with_user(self.user), self.user, {
+            'date_from': (date.today() - timedelta(days=30)).isoformat(),
+            'date_to': date.today().isoformat(),
+            'dimension_codes': ['customer_test'],
+        })
+        homonyms = [
+            row for row in result['rows']
+            if row['dimensions']['customer_test'] == 'Homonym Customer'
+        ]
+        self.assertEqual(len(homonyms), 2)
+        self.assertEqual([row['sales'] for row in homonyms], [30.0, 30.0])
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+from datetime import date, timedelta
+
+from odoo.tests.common import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestSaleDailySummary(TransactionCase):
+    """Tests for the ai.analyst.sale.daily.summary table."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.company = cls.env.ref('base.user_admin').company_id
+        cls.Summary = cls.env['ai.analyst.sale.daily.summary']
+
+        partner = cls.env['res.partner'].create({'name': 'Summary Customer'})
+        cls.product = cls.env['product.product'].create({
+            'name': 'Summary Product', 'type': 'consu',
+        })
+        cls.orders = cls.env['sale.order'].create([
+            {
+                'partner_id': partner.id,
+                'company_id': cls.company.id,
+                'date_order': date.today() - timedelta(days=i),
+                'order_line': [(0, 0, {
+                    'product_id': cls.product.id,
+                    'product_uom_qty': 3,
+                    'price_unit': 40.0,
+                })],
+            }
+            for i in range(3)
+        ])
+        cls.orders.action_confirm()
+
+    def assertSummaryMatchesLines(self):
+        lines = self.env['sale.order.line'].search([
+            ('state', 'in', ['sale', 'done']),
+            ('company_id', '=', self.company.id),
+        ])
+        rows = self.Summary.search([('company_id', '=', self.company.id)])
+        self.assertAlmostEqual(
+            sum(rows.mapped('revenue')), sum(lines.mapped('price_subtotal')), places=2,
+        )
+        self.assertAlmostEqual(
+            sum(rows.mapped('quantity')), sum(lines.mapped('product_uom_qty')), places=2,
+        )
+
+    def test_rebuild_matches_order_lines(self):
+        """Test a summary rebuild sums to the confirmed order lines."""
+        self.Summary.cron_rebuild()
+        self.assertSummaryMatchesLines()
+
+    def test_refresh_after_line_edit(self):
+        """Test an incremental refresh picks up an edited order line."""
+        self.Summary.cron_rebuild()
+        self.orders[0].order_line.write({'product_uom_qty': 7, 'price_unit': 55.0})
+        self.Summary.cron_refresh()
+        self.assertSummaryMatchesLines()
+
+    def test_refresh_after_order_deletion(self):
+        """Test an incremental refresh drops the rows of a deleted order."""
+        self.Summary.cron_rebuild()
+        order = self.orders[1]
+        day = order.date_order.date()
+        order._action_cancel()
+        order.unlink()
+
+        Dirty = self.env['ai.analyst.sale.daily.summary.dirty']
+        self.assertTrue(Dirty.search_count([('company_id', '=', self.company.id), ('date', '=', day)]))
+        self.Summary.cron_refresh()
+        self.assertFalse(Dirty.search_count([]))
+        self.assertSummaryMatchesLines()
@@ -10,7 +10,7 @@ Each tool is tested for:
 - Row limits
 """
 import logging
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 from unittest.mock import patch, MagicMock
 
 from odoo.tests.common import TransactionCase, tagged
@@ -125,6 +125,164 @@ class TestSalesSummaryTool(TransactionCase):
         self.assertIn('previous_period', result)
         self.assertIn('deltas', result)
 
+    def test_execute_cached_until_data_changes(self):
+        """Test repeated calls hit the cache until a new order is confirmed."""
+        from odoo.addons.ai_analyst.tools.registry import get_tool
+        tool = get_tool('get_sales_summary')
+
+        today = date.today()
+        validated = tool.validate_params({
+            'date_from': (today - timedelta(days=30)).isoformat(),
+            'date_to': today.isoformat(),
+        })
+        env_as_user = self.env(user=self.user.id)
+        first = tool.execute(env_as_user, self.user, validated)
+        count = first['summary']['order_count']
+
+        # Mutating a returned result must not leak into the cache
+        first['summary']['order_count'] = -1
+        second = tool.execute(env_as_user, self.user, validated)
+        self.assertEqual(second['summary']['order_count'], count)
+
+        order = self.env['sale.order'].create({
+            'partner_id': self.env['res.partner'].create({'name': 'Cache Customer'}).id,
+            'company_id': self.company.id,
+            'order_line': [(0, 0, {
+                'product_id': self.env['product.product'].create({
+                    'name': 'Cache Product', 'type': 'consu',
+                }).id,
+                'product_uom_qty': 1,
+                'price_unit': 10.0,
+            })],
+        })
+        order.action_confirm()
+        third = tool.execute(env_as_user, self.user, validated)
+        self.assertEqual(third['summary']['order_count'], count + 1)
+
+    def test_execute_cache_sees_pending_writes(self):
+        """Test a write not yet flushed to the database invalidates the cache."""
+        from odoo.addons.ai_analyst.tools.registry import get_tool
+        tool = get_tool('get_sales_summary')
+
+        today = date.today()
+        validated = tool.validate_params({
+            'date_from': (today - timedelta(days=30)).isoformat(),
+            'date_to': today.isoformat(),
+        })
+        env_as_user = self.env(user=self.user.id)
+        first = tool.execute(env_as_user, self.user, validated)
+
+        order = self.env['sale.order'].search([
+            ('company_id', '=', self.company.id), ('state', '=', 'sale'),
+        ], order='id desc', limit=1)
+        order.order_line[:1].price_unit += 50.0
+        second = tool.execute(env_as_user, self.user, validated)
+        self.assertGreater(second['summary']['total_revenue'], first['summary']['total_revenue'])
+
+
+@tagged('post_install', '-at_install')
+class TestTopSellersTool(TransactionCase):
+    """Tests for get_top_sellers tool."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = cls.env.ref('base.user_admin')
+        cls.company = cls.user.company_id
+
+        partner = cls.env['res.partner'].create({'name': 'Top Sellers Customer'})
+        products = cls.env['product.product'].create([
+            {'name': 'Top Seller Cheap', 'type': 'consu'},
+            {'name': 'Top Seller Dear', 'type': 'consu'},
+        ])
+        # The cheap product sells more units, the dear one more revenue
+        order = cls.env['sale.order'].create({
+            'partner_id': partner.id,
+            'company_id': cls.company.id,
+            'date_order': date.today(),
+            'order_line': [
+                (0, 0, {'product_id': products[0].id, 'product_uom_qty': 10, 'price_unit': 5.0}),
+                (0, 0, {'product_id': products[1].id, 'product_uom_qty': 1, 'price_unit': 500.0}),
+            ],
+        })
+        order.action_confirm()
+        cls.order = order
+
+    def test_top_sellers_multiple_metrics(self):
+        """Test one call returns a ranking per requested metric."""
+        from odoo.addons.ai_analyst.tools.registry import get_tool
+        tool = get_tool('get_top_sellers')
+
+        today = date.today()
+        validated = tool.validate_params({
+            'date_from': (today - timedelta(days=30)).isoformat(),
+            'date_to': today.isoformat(),
+            'metrics': ['quantity', 'revenue'],
+        })
+        result = tool.execute(self.env(user=self.user.id), self.user, validated)
+
+        self.assertEqual(result['ranked_by'], ['quantity', 'revenue'])
+        self.assertEqual(set(result['rankings']), {'quantity', 'revenue'})
+        for metric, ranking in result['rankings'].items():
+            values = [row[metric] for row in ranking['data']]
+            self.assertEqual(values, sorted(values, reverse=True))
+            self.assertEqual(ranking['total_results'], len(ranking['data']))
+
+    def test_top_sellers_cache_sees_line_edits(self):
+        """Test a write on order lines alone invalidates the cached ranking."""
+        from odoo.addons.ai_analyst.tools.registry import get_tool
+        tool = get_tool('get_top_sellers')
+
+        today = date.today()
+        validated = tool.validate_params({
+            'date_from': today.isoformat(),
+            'date_to': today.isoformat(),
+            'by': 'product',
+            'metric': 'quantity',
+            'limit': 100,
+        })
+        env_as_user = self.env(user=self.user.id)
+        first = tool.execute(env_as_user, self.user, validated)
+        quantities = {row['id']: row['quantity'] for row in first['data']}
+
+        line = self.order.order_line[:1]
+        line.product_uom_qty += 5
+        second = tool.execute(env_as_user, self.user, validated)
+        quantities[line.product_id.id] += 5
+        self.assertEqual({row['id']: row['quantity'] for row in second['data']}, quantities)
+
+
+@tagged('post_install', '-at_install')
+class TestStockAgingTool(TransactionCase):
+    """Tests for get_stock_aging tool."""
+
+    def test_ranked_columns_same_values_with_and_without_numpy(self):
+        """Test row values do not depend on which ranking path computed them."""
+        from odoo.addons.ai_analyst.tools import tool_stock_aging
+        if not tool_stock_aging.HAS_NUMPY:
+            self.skipTest('NumPy is not installed')
+        tool = tool_stock_aging.StockAgingTool
+        today = date.today()
+        quant_data = [
+            {
+                'product_id': i,
+                'quantity': 0.125 * i + 0.005,
+                'last_date': datetime(2020, 1, 1) + timedelta(days=i) if i % 3 else None,
+            }
+            for i in range(1, 81)
+        ]
+        costs = {i: 1.005 * i for i in range(1, 81)}
+
+        def shaped(columns):
+            order, quantities, valuations, days = columns
+            return [(i, round(quantities[i], 2), round(valuations[i], 2), days[i]) for i in order]
+
+        for sort_by in ('days_since_last_sale', 'valuation', 'qty_on_hand'):
+            vectorized = tool._ranked_columns(quant_data, costs, today, sort_by, 50)
+            with patch.object(tool_stock_aging, 'HAS_NUMPY', False):
+                fallback = tool._ranked_columns(quant_data, costs, today, sort_by, 50)
+            self.assertEqual(shaped(vectorized), shaped(fallback), sort_by)
+
 
 @tagged('post_install', '-at_install')
 class TestToolAccessControl(TransactionCase):
@@ -9,14 +9,111 @@ Every tool must:
 - Execute using with_user() context (never sudo)
 - Return structured data
 """
+import copy
+import functools
+import json
 import logging
+import threading
+import time
 from abc import ABC, abstractmethod
-from datetime import datetime
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import babel.dates
+import pytz
 
 from odoo.exceptions import ValidationError
+from odoo.models import READ_GROUP_DISPLAY_FORMAT
+from odoo.tools import SQL
+from odoo.tools.misc import get_lang
 
 _logger = logging.getLogger(__name__)
 
+# Process-wide LRU of analytic tool results: {key: (expires_at, result)}
+_ANALYTIC_CACHE = OrderedDict()
+_ANALYTIC_CACHE_LOCK = threading.Lock()
+_ANALYTIC_CACHE_SIZE = 512
+
+# {db_name: (registry_sequence, has_margin)}, refreshed when the registry reloads
+_HAS_MARGIN = {}
+
+
+def cached_analytic(tables, ttl=300):
+    """Method decorator caching a read-only tool's ``execute`` result.
+
+    The cache key covers the database, tool, user, company, allowed companies,
+    groups, language, timezone and parameters, plus a freshness stamp
+    (``MAX(write_date)`` and ``MAX(id)`` of ``tables`` for the user's
+    company). Any write to the source tables
+    changes the stamp, so a hit costs one cheap query instead of the full
+    aggregation. ``ttl`` (seconds) bounds how long an entry may be served;
+    it may also be a callable returning the TTL for the call's parameters.
+
+    Usage:
+        @cached_analytic(tables=('sale_order',), ttl=300)
+        def execute(self, env, user, params):
+            ...
+    """
+    if isinstance(tables, str):
+        tables = (tables,)
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, env, user, params):
+            company_id = user.company_id.id
+            key = (
+                env.cr.dbname, self.name, env.uid, company_id,
+                # Record rules depend on the allowed companies and groups
+                tuple(env.companies.ids), tuple(sorted(env.user.groups_id.ids)),
+                env.lang, env.context.get('tz'),
+                json.dumps(params, sort_keys=True, default=str),
+                _data_stamp(env, tables, company_id),
+            )
+            now = time.monotonic()
+            with _ANALYTIC_CACHE_LOCK:
+                entry = _ANALYTIC_CACHE.get(key)
+                if entry and entry[0] > now:
+                    _ANALYTIC_CACHE.move_to_end(key)
+                    return copy.deepcopy(entry[1])
+
+            result = method(self, env, user, params)
+
+            expires_at = now + (ttl(params) if callable(ttl) else ttl)
+            with _ANALYTIC_CACHE_LOCK:
+                _ANALYTIC_CACHE[key] = (expires_at, copy.deepcopy(result))
+                _ANALYTIC_CACHE.move_to_end(key)
+                while len(_ANALYTIC_CACHE) > _ANALYTIC_CACHE_SIZE:
+                    _ANALYTIC_CACHE.popitem(last=False)
+            return result
+        return wrapper
+    return decorator
+
+
+def _data_stamp(env, tables, company_id):
+    """Return a tuple that changes whenever rows of ``tables`` are written.
+
+    Pending ORM writes are flushed first. ``MAX(write_date)`` of the company
+    reads the ``(company_id, write_date)`` indexes created by the inherited
+    models and ``MAX(id)`` (all companies) the primary key. Within one
+    transaction write_date does not move (it is the transaction timestamp),
+    so the transaction's own inserts, updates and deletes are counted too.
+    """
+    env.flush_all()
+    stamp = []
+    for table in tables:
+        env.cr.execute(SQL(
+            """
+            SELECT (SELECT MAX(write_date) FROM %(table)s WHERE company_id = %(company_id)s),
+                   (SELECT MAX(id) FROM %(table)s),
+                   pg_stat_get_xact_tuples_inserted(%(name)s::regclass)
+                   + pg_stat_get_xact_tuples_updated(%(name)s::regclass)
+                   + pg_stat_get_xact_tuples_deleted(%(name)s::regclass)
+            """,
+            table=SQL.identifier(table), company_id=company_id, name=table,
+        ))
+        stamp.extend(env.cr.fetchone())
+    return tuple(stamp)
+
 
 class BaseTool(ABC):
     """Abstract base class for AI Analyst tools.
@@ -78,10 +175,7 @@ class BaseTool(ABC):
         Raises:
             ValidationError: If required params are missing or invalid.
         """
-        schema = self.parameters_schema
-        properties = schema.get('properties', {})
-        required = schema.get('required', [])
-        validated = {}
+        required, validators = self._compiled_schema()
 
         # Check required fields
         for field_name in required:
@@ -91,76 +185,102 @@ class BaseTool(ABC):
                 )
 
         # Validate and coerce each provided parameter
-        for field_name, field_schema in properties.items():
-            if field_name not in params:
-                # Use default if available
-                if 'default' in field_schema:
-                    validated[field_name] = field_schema['default']
-                continue
-
-            value = params[field_name]
-            field_type = field_schema.get('type', 'string')
-            fmt = field_schema.get('format', '')
+        validated = {}
+        for field_name, has_default, default, coerce in validators:
+            if field_name in params:
+                validated[field_name] = coerce(params[field_name])
+            elif has_default:
+                validated[field_name] = default
+        return validated
 
-            # Date validation
-            if field_type == 'string' and fmt == 'date':
-                validated[field_name] = self._validate_date(field_name, value)
+    def _compiled_schema(self):
+        """Return ``(required, validators)`` compiled from ``parameters_schema``.
 
-            # Integer with min/max
-            elif field_type == 'integer':
+        The schema is walked once per tool class (and again only if the
+        class gets a new schema dict): ``validators`` holds one
+        ``(field_name, has_default, default, coerce)`` entry per property.
+        """
+        cls = type(self)
+        schema = self.parameters_schema
+        compiled = cls.__dict__.get('_compiled_params')
+        if compiled is None or compiled[0] is not schema:
+            validators = tuple(
+                (
+                    field_name,
+                    'default' in field_schema,
+                    field_schema.get('default'),
+                    self._field_validator(field_name, field_schema),
+                )
+                for field_name, field_schema in schema.get('properties', {}).items()
+            )
+            compiled = (schema, tuple(schema.get('required', [])), validators)
+            cls._compiled_params = compiled
+        return compiled[1], compiled[2]
+
+    def _field_validator(self, field_name, field_schema):
+        """Return the function checking and coercing a value of ``field_schema``."""
+        field_type = field_schema.get('type', 'string')
+        fmt = field_schema.get('format', '')
+
+        # Date validation
+        if field_type == 'string' and fmt == 'date':
+            return functools.partial(self._validate_date, field_name)
+
+        # Integer with min/max
+        if field_type == 'integer':
+            minimum = field_schema.get('minimum')
+            maximum = field_schema.get('maximum')
+
+            def coerce_integer(value):
                 try:
                     int_val = int(value)
                 except (ValueError, TypeError):
                     raise ValidationError(
                         f'Parameter "{field_name}" must be an integer.'
                     )
-                minimum = field_schema.get('minimum')
-                maximum = field_schema.get('maximum')
                 if minimum is not None:
                     int_val = max(int_val, minimum)
                 if maximum is not None:
                     int_val = min(int_val, maximum)
-                validated[field_name] = int_val
+                return int_val
+            return coerce_integer
 
-            # Boolean
-            elif field_type == 'boolean':
+        # Boolean
+        if field_type == 'boolean':
+            def coerce_boolean(value):
                 if isinstance(value, bool):
-                    validated[field_name] = value
-                elif isinstance(value, str):
-                    validated[field_name] = value.lower() in ('true', '1', 'yes')
-                else:
-                    validated[field_name] = bool(value)
-
-            # Enum (string with allowed values)
-            elif field_type == 'string' and 'enum' in field_schema:
-                allowed = field_schema['enum']
-                if value not in allowed:
-                    validated[field_name] = field_schema.get('default', allowed[0])
-                else:
-                    validated[field_name] = value
-
-            # Array of integers (e.g., IDs)
-            elif field_type == 'array':
-                if isinstance(value, list):
-                    item_type = field_schema.get('items', {}).get('type', 'integer')
-                    if item_type == 'integer':
-                        try:
-                            validated[field_name] = [int(v) for v in value]
-                        except (ValueError, TypeError):
-                            validated[field_name] = []
-                    else:
-                        validated[field_name] = value
-                else:
-                    validated[field_name] = []
-
-            # Plain string
-            elif field_type == 'string':
-                validated[field_name] = str(value) if value is not None else ''
-
-            else:
-                validated[field_name] = value
+                    return value
+                if isinstance(value, str):
+                    return value.lower() in ('true', '1', 'yes')
+                return bool(value)
+            return coerce_boolean
+
+        # Enum (string with allowed values)
+        if field_type == 'string' and 'enum' in field_schema:
+            allowed = field_schema['enum']
+            fallback = field_schema.get('default', allowed[0])
+            return lambda value: value if value in allowed else fallback
+
+        # Array of integers (e.g., IDs)
+        if field_type == 'array':
+            item_type = field_schema.get('items', {}).get('type', 'integer')
+
+            def coerce_array(value):
+                if not isinstance(value, list):
+                    return []
+                if item_type != 'integer':
+                    return value
+                try:
+                    return [int(v) for v in value]
+                except (ValueError, TypeError):
+                    return []
+            return coerce_array
 
-        return validated
+        # Plain string
+        if field_type == 'string':
+            return lambda value: str(value) if value is not None else ''
+
+        return lambda value: value
 
     @abstractmethod
     def execute(self, env, user, params: dict) -> dict:
@@ -194,6 +314,212 @@ class BaseTool(ABC):
             f'Parameter "{field_name}" must be a date string in YYYY-MM-DD format.'
         )
 
+    @staticmethod
+    def _next_day(date_str):
+        """Return the day after ``date_str`` (YYYY-MM-DD), as an exclusive upper bound.
+
+        Filtering ``>= date_from`` and ``< next_day(date_to)`` covers whole
+        days without string concatenation or missing fractional seconds.
+        """
+        return (datetime.strptime(date_str, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+
+    @staticmethod
+    def _secure_query(model, domain):
+        """Return a ``Query`` over ``domain`` with the user's ACLs and record rules applied.
+
+        Raw aggregates selected from this query see exactly the rows the ORM
+        would return to the user, so bypassing ``read_group`` never widens
+        access.
+        """
+        query = model._search(domain)
+        # Aggregates never need the model's default ordering
+        query.order = None
+        return query
+
+    @staticmethod
+    def _join(query, alias, column, table, link, kind='LEFT JOIN'):
+        """Join ``table`` on ``table.id = alias.column`` and return the new alias."""
+        rhs = query.make_alias(alias, link)
+        query.add_join(kind, rhs, table, SQL(
+            '%s = %s', SQL.identifier(rhs, 'id'), SQL.identifier(alias, column),
+        ))
+        return rhs
+
+    @staticmethod
+    def _fetch_dicts(env, query, *select):
+        """Execute ``SELECT select FROM query`` and return the rows as dicts."""
+        env.flush_all()
+        env.cr.execute(query.select(*select))
+        return env.cr.dictfetchall()
+
+    @staticmethod
+    def _has_like_wildcard(value):
+        """Return whether ``value`` contains a LIKE wildcard (``%`` or ``_``)."""
+        return '%' in value or '_' in value
+
+    @classmethod
+    def _field_path_sql(cls, env, query, alias, model_name, path, name_many2one=False):
+        """Return ``(sql, field)`` for dotted field ``path`` read from ``alias``.
+
+        Each many2one hop is LEFT JOINed once (joins on a shared prefix are
+        reused); translated fields resolve to the user's language with an
+        ``en_US`` fallback. Only stored fields can be reached; fields
+        inherited through ``_inherits`` (e.g. ``categ_id`` on
+        ``product.product``) are read from the parent model's column.
+
+        With ``name_many2one`` (meant for filters: distinct records sharing a
+        name are not told apart), a path ending on a many2one whose comodel
+        ``_rec_name`` is stored (on the comodel or an ``_inherits`` parent)
+        selects that name column directly; ``field`` is then the name field.
+        Otherwise the id is returned and ``field`` stays the many2one (see
+        ``_name_many2one_columns``).
+        """
+        model = env[model_name]
+        names = path.split('.')
+        for index, fname in enumerate(names):
+            field = model._fields.get(fname)
+            while field is not None and field.inherited and not field.store:
+                # Join the _inherits parent holding the column
+                parent = env[field.related_field.model_name]
+                link = model._inherits[parent._name]
+                alias = cls._join(query, alias, link, parent._table, link)
+                model, field = parent, parent._fields.get(fname)
+            if field is None or not field.store or not field.column_type:
+                raise ValidationError(
+                    f'Field path "{path}" is not a stored field path on {model_name}.'
+                )
+            if index == len(names) - 1:
+                break
+            if field.type != 'many2one':
+                raise ValidationError(
+                    f'Field path "{path}" can only traverse many2one fields.'
+                )
+            model = env[field.comodel_name]
+            alias = cls._join(query, alias, fname, model._table, fname)
+        if name_many2one and field.type == 'many2one':
+            comodel = env[field.comodel_name]
+            name_field = comodel._fields.get(comodel._rec_name)
+            while name_field is not None and name_field.inherited and not name_field.store:
+                name_field = name_field.related_field
+            if name_field and name_field.store and name_field.column_type:
+                # Read the name through the same hops (and _inherits parents)
+                return cls._field_path_sql(
+                    env, query, alias, model._name, f'{fname}.{comodel._rec_name}',
+                )
+        column = SQL.identifier(alias, fname)
+        if field.translate:
+            column = SQL("COALESCE(%s->>%s, %s->>'en_US')", column, env.lang or 'en_US', column)
+        return column, field
+
+    @staticmethod
+    def _date_bucket(env, column, granularity):
+        """Return SQL truncating datetime ``column`` to ``granularity``.
+
+        Like ``read_group``, the value is shifted to the user's timezone
+        first so that orders near midnight land in the right day.
+        """
+        tz = env.context.get('tz')
+        if tz in pytz.all_timezones_set:
+            column = SQL("timezone(%s, timezone('UTC', %s))", tz, column)
+        return SQL('date_trunc(%s, %s)', granularity, column)
+
+    @staticmethod
+    def _period_label(env, value, granularity):
+        """Format a truncated period value the way ``read_group`` labels it."""
+        if not value:
+            return False
+        return babel.dates.format_date(
+            value, format=READ_GROUP_DISPLAY_FORMAT[granularity],
+            locale=get_lang(env).code,
+        )
+
+    def _sum_and_count(self, model, domain, field='amount_total'):
+        """Return ``(SUM(field), COUNT(*))`` over ``domain`` in one query."""
+        query = self._secure_query(model, domain)
+        row = self._fetch_dicts(
+            model.env, query,
+            SQL('COALESCE(SUM(%s), 0) AS total', SQL.identifier(query.table, field)),
+            SQL('COUNT(*) AS count'),
+        )[0]
+        return row['total'], row['count']
+
+    def _totals_and_series(self, model, domain, granularity, field='amount_total',
+                           date_field='date_order'):
+        """Return ``(SUM(field), COUNT(*), series)`` from a single aggregate.
+
+        ``series`` is ``[(period_label, SUM(field), COUNT(*))]`` ordered by
+        period. The overall totals come out of the same scan as an extra
+        empty grouping set instead of a second query.
+        """
+        env = model.env
+        query = self._secure_query(model, domain)
+        bucket = self._date_bucket(env, SQL.identifier(query.table, date_field), granularity)
+        query.groupby = SQL('GROUPING SETS ((%s), ())', bucket)
+        # The grand total row sorts first so the row limit never drops it
+        query.order = SQL('GROUPING(%s) DESC, %s', bucket, bucket)
+        query.limit = self.max_rows + 1
+        rows = self._fetch_dicts(
+            env, query,
+            SQL('%s AS period', bucket),
+            SQL('GROUPING(%s) AS is_total', bucket),
+            SQL('COALESCE(SUM(%s), 0) AS total', SQL.identifier(query.table, field)),
+            SQL('COUNT(*) AS count'),
+        )
+        totals, periods = rows[0], rows[1:]
+        series = [
+            (self._period_label(env, row['period'], granularity), row['total'], row['count'])
+            for row in periods
+        ]
+        return totals['total'], totals['count'], series
+
+    @classmethod
+    def _name_many2one_columns(cls, env, rows, fields_by_key):
+        """Replace many2one ids in ``rows[key]`` by display names, one read per column."""
+        for key, field in fields_by_key.items():
+            if field.type != 'many2one':
+                continue
+            names = cls._display_names(env[field.comodel_name].browse(
+                {row[key] for row in rows if row[key]}
+            ))
+            for row in rows:
+                if row[key]:
+                    row[key] = names.get(row[key], row[key])
+
+    @staticmethod
+    def _display_names(records):
+        """Return ``{id: display_name}`` for ``records`` in one batched read."""
+        return {
+            rec['id']: rec['display_name']
+            for rec in records.with_context(prefetch_fields=False).read(['display_name'])
+        }
+
+    @staticmethod
+    def _has_margin(env):
+        """Return whether sale_margin's ``margin`` field exists, memoized per registry."""
+        registry = env.registry
+        cached = _HAS_MARGIN.get(registry.db_name)
+        if cached is None or cached[0] != registry.registry_sequence:
+            cached = (registry.registry_sequence, 'margin' in env['sale.order.line']._fields)
+            _HAS_MARGIN[registry.db_name] = cached
+        return cached[1]
+
+    @staticmethod
+    def _get_costs(env, product_ids, company_id):
+        """Return ``{product_id: standard_price}`` in ``company_id``.
+
+        Costs are cached for the current transaction (in the cursor's
+        pre-commit data, dropped on commit and rollback), so tools called in
+        sequence on overlapping products only read the missing ones.
+        """
+        cache = env.cr.precommit.data.setdefault('ai_analyst.product_costs', {})
+        costs = cache.setdefault((env.uid, company_id), {})
+        missing = [pid for pid in dict.fromkeys(product_ids) if pid not in costs]
+        if missing:
+            Product = env['product.product'].with_company(company_id)
+            for product in Product.browse(missing).read(['standard_price']):
+                costs[product['id']] = product['standard_price']
+        return {pid: costs.get(pid, 0.0) for pid in product_ids}
+
     @staticmethod
     def _format_currency(value, currency_name=''):
         """Format a number as currency string."""
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Config Cache — process-wide cache of dimension and synonym configuration.
+==========================================================================
+Dimensions and their synonyms are tiny, rarely edited tables that every
+dimension-aware tool call used to reload. They are cached here as plain
+structures, per database and user, and revalidated on each call against a
+cheap freshness stamp (latest ``write_date`` and row count of both
+tables). Edits made through the ORM also clear the cache immediately, so
+changes inside the current transaction are never served stale.
+"""
+import threading
+from collections import OrderedDict, defaultdict, namedtuple
+
+from .synonym_index import SynonymIndex
+
+DimInfo = namedtuple('DimInfo', 'id code field_name')
+
+# {key: (stamp, value)}, least recently used first
+_CACHE = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+_CACHE_SIZE = 256
+
+
+def invalidate():
+    """Drop every cached entry (called when the configuration is edited)."""
+    with _CACHE_LOCK:
+        _CACHE.clear()
+
+
+def _stamp(env):
+    """Return the freshness stamp of the dimension configuration tables."""
+    env['ai.analyst.dimension'].flush_model()
+    env['ai.analyst.dimension.synonym'].flush_model()
+    env.cr.execute("""
+        SELECT (SELECT MAX(write_date) FROM ai_analyst_dimension),
+               (SELECT COUNT(*) FROM ai_analyst_dimension),
+               (SELECT MAX(write_date) FROM ai_analyst_dimension_synonym),
+               (SELECT COUNT(*) FROM ai_analyst_dimension_synonym)
+    """)
+    return env.cr.fetchone()
+
+
+def _get(key, stamp):
+    with _CACHE_LOCK:
+        hit = _CACHE.get(key)
+        if hit is None or hit[0] != stamp:
+            return None
+        _CACHE.move_to_end(key)
+        return hit[1]
+
+
+def _put(key, stamp, value):
+    with _CACHE_LOCK:
+        _CACHE[key] = (stamp, value)
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > _CACHE_SIZE:
+            _CACHE.popitem(last=False)
+
+
+def load_dimensions(env, company_ids):
+    """Return ``{code: DimInfo}`` of the active dimensions visible from ``company_ids``.
+
+    When several visible dimensions share a code, the last one in the
+    model order wins, as with the dict the tools used to build per call.
+    """
+    stamp = _stamp(env)
+    company_ids = tuple(sorted(company_ids))
+    key = (env.cr.dbname, env.uid, tuple(env.companies.ids), 'dimensions', company_ids)
+    by_code = _get(key, stamp)
+    if by_code is None:
+        by_code = {}
+        for row in env['ai.analyst.dimension'].search_read([
+            ('is_active', '=', True),
+            '|', ('company_id', '=', False), ('company_id', 'in', list(company_ids)),
+        ], ['code', 'field_name']):
+            by_code[row['code']] = DimInfo(row['id'], row['code'], row['field_name'])
+        _put(key, stamp, by_code)
+    return by_code
+
+
+def load_synonym_indexes(env, dimension_ids):
+    """Return ``{dimension_id: SynonymIndex}``, loading only the missing ones in one query."""
+    stamp = _stamp(env)
+    prefix = (env.cr.dbname, env.uid, tuple(env.companies.ids), 'synonyms')
+    indexes = {}
+    missing = []
+    for dimension_id in dict.fromkeys(dimension_ids):
+        index = _get((*prefix, dimension_id), stamp)
+        if index is None:
+            missing.append(dimension_id)
+        else:
+            indexes[dimension_id] = index
+    if missing:
+        rows_by_dim = defaultdict(list)
+        for row in env['ai.analyst.dimension.synonym'].search_read([
+            ('dimension_id', 'in', missing),
+            ('is_active', '=', True),
+        ], ['dimension_id', 'synonym', 'match_type', 'canonical_value'], order='priority asc, id asc'):
+            rows_by_dim[row['dimension_id'][0]].append(row)
+        for dimension_id in missing:
+            index = SynonymIndex(rows_by_dim[dimension_id])
+            _put((*prefix, dimension_id), stamp, index)
+            indexes[dimension_id] = index
+    return indexes
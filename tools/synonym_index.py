@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Synonym Index — constant-time-per-character synonym lookup for dimensions.
+===========================================================================
+Synonyms are ranked by their priority order. A value resolves to the
+canonical value of the best-ranked synonym that matches it, whatever its
+match type:
+
+- exact:    dict lookup
+- prefix:   trie walk along the value
+- contains: Aho-Corasick automaton, one pass over the value
+- regex:    compiled patterns, only tried while they can still beat the
+            best rank found so far
+"""
+import logging
+import re
+
+_logger = logging.getLogger(__name__)
+
+
+class SynonymIndex:
+    """Match index over a dimension's synonyms, built once and reused."""
+
+    __slots__ = (
+        '_canonical', '_exact', '_prefix', '_prefix_rank',
+        '_contains', '_fail', '_best', '_regexes', '_first_fuzzy',
+    )
+
+    def __init__(self, synonyms):
+        """Build the index from synonym dicts sorted by priority.
+
+        Each dict carries ``synonym``, ``match_type`` and
+        ``canonical_value`` (as returned by ``search_read``).
+        """
+        self._canonical = []
+        self._exact = {}
+        self._prefix = [{}]          # trie nodes: {char: child node}
+        self._regexes = []
+        self._first_fuzzy = None     # best rank of any non-exact synonym
+        prefix_rank = {}
+        contains_terms = []
+
+        for row in synonyms:
+            term = (row['synonym'] or '').strip()
+            if not term:
+                continue
+            kind = row['match_type']
+            if kind == 'regex' and re.escape(term) == term:
+                # A regex without metacharacters is just a substring test
+                kind = 'contains'
+            if kind == 'regex':
+                try:
+                    regex = re.compile(term, re.IGNORECASE)
+                except re.error:
+                    _logger.warning('Skipping invalid synonym regex %r (id %s)', term, row.get('id'))
+                    continue
+            rank = len(self._canonical)
+            self._canonical.append(row['canonical_value'])
+            term_l = term.lower()
+            if kind != 'exact' and self._first_fuzzy is None:
+                self._first_fuzzy = rank
+            if kind == 'exact':
+                self._exact.setdefault(term_l, rank)
+            elif kind == 'prefix':
+                node = self._insert(self._prefix, term_l)
+                prefix_rank.setdefault(node, rank)
+            elif kind == 'contains':
+                contains_terms.append((term_l, rank))
+            elif kind == 'regex':
+                self._regexes.append((rank, regex))
+
+        self._prefix_rank = [prefix_rank.get(i) for i in range(len(self._prefix))]
+        self._build_contains(contains_terms)
+
+    @staticmethod
+    def _insert(goto, term):
+        node = 0
+        for ch in term:
+            child = goto[node].get(ch)
+            if child is None:
+                child = len(goto)
+                goto[node][ch] = child
+                goto.append({})
+            node = child
+        return node
+
+    def _build_contains(self, terms):
+        """Build the Aho-Corasick automaton over the 'contains' terms."""
+        goto = [{}]
+        own = {}
+        for term_l, rank in terms:
+            node = self._insert(goto, term_l)
+            if node not in own:
+                own[node] = rank
+        inf = len(self._canonical)
+        fail = [0] * len(goto)
+        best = [own.get(i, inf) for i in range(len(goto))]
+        queue = list(goto[0].values())
+        for node in queue:
+            for ch, child in goto[node].items():
+                state = fail[node]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(ch, 0)
+                # Best rank of any term ending here, including via suffix links
+                best[child] = min(best[child], best[fail[child]])
+                queue.append(child)
+        self._contains = goto
+        self._fail = fail
+        self._best = best
+
+    def lookup(self, value_l, value):
+        """Return the canonical value of the best synonym matching, or ``None``.
+
+        ``value_l`` is the stripped, lowercased value; ``value`` the raw one
+        (regex synonyms are matched against it, case-insensitively).
+        """
+        best = len(self._canonical)
+
+        rank = self._exact.get(value_l)
+        if rank is not None:
+            # Nothing ranked before this exact hit can match any other way
+            if self._first_fuzzy is None or rank < self._first_fuzzy:
+                return self._canonical[rank]
+            best = rank
+
+        goto, ranks = self._prefix, self._prefix_rank
+        node = 0
+        for ch in value_l:
+            node = goto[node].get(ch)
+            if node is None:
+                break
+            rank = ranks[node]
+            if rank is not None and rank < best:
+                best = rank
+
+        if len(self._contains) > 1:
+            goto, fail, best_at = self._contains, self._fail, self._best
+            state = 0
+            for ch in value_l:
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(ch, 0)
+                if best_at[state] < best:
+                    best = best_at[state]
+
+        for rank, regex in self._regexes:
+            if rank >= best:
+                break
+            if regex.search(value):
+                best = rank
+                break
+
+        if best < len(self._canonical):
+            return self._canonical[best]
+        return None
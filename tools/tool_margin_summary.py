@@ -1,12 +1,18 @@
 # -*- coding: utf-8 -*-
 """Tool: get_margin_summary — Profit margin analysis by product, category, time, or salesperson."""
+import heapq
 import logging
 
-from .base_tool import BaseTool
+from odoo.tools import SQL
+
+from .base_tool import BaseTool, cached_analytic
 from .registry import register_tool
 
 _logger = logging.getLogger(__name__)
 
+# Static domain leaves, shared by every call
+_CONFIRMED = ('order_id.state', 'in', ('sale', 'done'))
+
 
 @register_tool
 class MarginSummaryTool(BaseTool):
@@ -38,87 +44,121 @@ class MarginSummaryTool(BaseTool):
                 'maximum': 100,
                 'default': 20,
             },
+            'include_margin': {
+                'type': 'boolean',
+                'default': True,
+                'description': 'Set to false to return only revenue and quantity, skipping cost and margin',
+            },
         },
         'required': ['date_from', 'date_to'],
     }
 
+    # Comodels of the id groupings, for batched name resolution
+    _GROUPBY_COMODELS = {
+        'product': 'product.product',
+        'category': 'product.category',
+        'salesperson': 'res.users',
+    }
+
+    @cached_analytic(tables=('sale_order', 'sale_order_line'), ttl=300)
     def execute(self, env, user, params):
         date_from = params['date_from']
         date_to = params['date_to']
         group_by = params.get('group_by', 'category')
         limit = params.get('limit', 20)
+        include_margin = params.get('include_margin', True)
         company_id = user.company_id.id
         currency = user.company_id.currency_id.name or 'USD'
 
         SOLine = env['sale.order.line']
 
         domain = [
-            ('order_id.state', 'in', ['sale', 'done']),
+            _CONFIRMED,
             ('order_id.date_order', '>=', date_from),
-            ('order_id.date_order', '<=', date_to + ' 23:59:59'),
+            ('order_id.date_order', '<', self._next_day(date_to)),
             ('order_id.company_id', '=', company_id),
         ]
 
-        # Determine ORM groupby field
-        groupby_map = {
-            'product': 'product_id',
-            'category': 'product_id.categ_id',
-            'month': 'order_id.date_order:month',
-            'salesperson': 'salesman_id',
-        }
-        orm_groupby = groupby_map.get(group_by, 'product_id.categ_id')
-
-        # Check if margin field exists
-        has_margin = 'margin' in SOLine._fields
-
-        agg_fields = ['price_subtotal:sum', 'product_uom_qty:sum']
+        # Check if margin field exists; skip the margin aggregate entirely
+        # when the caller only wants revenue and quantity
+        margin_available = self._has_margin(env)
+        has_margin = include_margin and margin_available
+
+        # Aggregate straight from the secured query: no read_group __domain
+        # building, and dotted groupings become plain joins
+        query = self._secure_query(SOLine, domain)
+        line = query.table
+        if group_by == 'month':
+            order = self._join(query, line, 'order_id', 'sale_order', 'margin_order', kind='JOIN')
+            group_sql = self._date_bucket(env, SQL.identifier(order, 'date_order'), 'month')
+        elif group_by == 'product':
+            group_sql = SQL.identifier(line, 'product_id')
+        elif group_by == 'salesperson':
+            group_sql = SQL.identifier(line, 'salesman_id')
+        else:
+            product = self._join(query, line, 'product_id', 'product_product', 'margin_product')
+            template = self._join(query, product, 'product_tmpl_id', 'product_template', 'template')
+            group_sql = SQL.identifier(template, 'categ_id')
+        query.groupby = group_sql
+
+        # Every value is rounded once, in SQL (numeric, half away from zero),
+        # whatever the number of groups
+        revenue_sql = SQL('ROUND(COALESCE(SUM(%s), 0)::numeric, 2)',
+                          SQL.identifier(line, 'price_subtotal'))
+        select = [
+            SQL('%s AS entity', group_sql),
+            SQL('%s::float AS revenue', revenue_sql),
+            SQL('ROUND(COALESCE(SUM(%s), 0)::numeric, 2)::float AS qty',
+                SQL.identifier(line, 'product_uom_qty')),
+        ]
         if has_margin:
-            agg_fields.append('margin:sum')
-
-        group_data = SOLine.read_group(
-            domain,
-            fields=agg_fields,
-            groupby=[orm_groupby],
-            orderby='price_subtotal desc',
-            limit=limit,
-        )
+            margin_sql = SQL('ROUND(COALESCE(SUM(%s), 0)::numeric, 2)',
+                             SQL.identifier(line, 'margin'))
+            select += [
+                SQL('%s::float AS margin', margin_sql),
+                SQL('(%s - %s)::float AS cost', revenue_sql, margin_sql),
+                SQL('CASE WHEN %s > 0 THEN ROUND(%s / %s * 100, 1)::float END AS margin_pct',
+                    revenue_sql, margin_sql, revenue_sql),
+            ]
+        group_data = self._fetch_dicts(env, query, *select)
+
+        # Top-N by revenue is picked in Python rather than by a server-side
+        # sort over the whole grouped result
+        group_data = heapq.nlargest(limit, group_data, key=lambda row: row['revenue'])
+
+        # Resolve many2one names in one batched read instead of per-group name_get
+        names = {}
+        comodel = self._GROUPBY_COMODELS.get(group_by)
+        if comodel:
+            names = self._display_names(env[comodel].browse(
+                [row['entity'] for row in group_data if row['entity']]
+            ))
 
         rows = []
-        total_revenue = 0
-        total_margin = 0
-
         for row in group_data:
-            entity = row.get(orm_groupby)
-            entity_name = 'Unknown'
-            if isinstance(entity, (list, tuple)) and len(entity) >= 2:
-                entity_name = entity[1]
-            elif isinstance(entity, str):
-                entity_name = entity
-            elif entity:
-                entity_name = str(entity)
-
-            revenue = round(row.get('price_subtotal', 0) or 0, 2)
-            qty = round(row.get('product_uom_qty', 0) or 0, 2)
-            margin = round(row.get('margin', 0) or 0, 2) if has_margin else None
-            cost = round(revenue - margin, 2) if margin is not None else None
-            margin_pct = round((margin / revenue * 100), 1) if margin is not None and revenue > 0 else None
-
-            total_revenue += revenue
-            if margin is not None:
-                total_margin += margin
+            entity = row['entity']
+            if not entity:
+                entity_name = 'Unknown'
+            elif comodel:
+                entity_name = names.get(entity, 'Unknown')
+            else:
+                entity_name = self._period_label(env, entity, 'month')
 
             entry = {
                 'name': entity_name,
-                'revenue': revenue,
-                'quantity': qty,
+                'revenue': row['revenue'],
+                'quantity': row['qty'],
             }
-            if margin is not None:
-                entry['cost'] = cost
-                entry['margin'] = margin
-                entry['margin_pct'] = margin_pct
+            if has_margin:
+                entry['cost'] = row['cost']
+                entry['margin'] = row['margin']
+                entry['margin_pct'] = row['margin_pct']
 
             rows.append(entry)
 
+        total_revenue = sum(row['revenue'] for row in group_data)
+        total_margin = sum(row['margin'] for row in group_data) if has_margin else 0
+
         result = {
             'period': {'from': date_from, 'to': date_to},
             'grouped_by': group_by,
@@ -135,7 +175,7 @@ class MarginSummaryTool(BaseTool):
             result['totals']['total_margin'] = round(total_margin, 2)
             result['totals']['overall_margin_pct'] = overall_margin_pct
 
-        if not has_margin:
+        if include_margin and not margin_available:
             result['warning'] = (
                 'Margin data is not available. Install the sale_margin module '
                 'and ensure purchase_price is set on sale order lines.'
@@ -3,11 +3,16 @@
 import logging
 from datetime import datetime, timedelta
 
-from .base_tool import BaseTool
+from odoo.tools import SQL
+
+from .base_tool import BaseTool, cached_analytic
 from .registry import register_tool
 
 _logger = logging.getLogger(__name__)
 
+# Static domain leaves, shared by every call
+_PAID = ('state', 'in', ('paid', 'done', 'invoiced'))
+
 
 @register_tool
 class POSSummaryTool(BaseTool):
@@ -47,6 +52,7 @@ class POSSummaryTool(BaseTool):
         'required': ['date_from', 'date_to'],
     }
 
+    @cached_analytic(tables=('pos_order',), ttl=300)
     def execute(self, env, user, params):
         date_from = params['date_from']
         date_to = params['date_to']
@@ -56,14 +62,15 @@ class POSSummaryTool(BaseTool):
         company_id = user.company_id.id
         currency = user.company_id.currency_id.name or 'USD'
 
-        domain = [
-            ('state', 'in', ['paid', 'done', 'invoiced']),
-            ('date_order', '>=', date_from + ' 00:00:00'),
-            ('date_order', '<=', date_to + ' 23:59:59'),
-            ('company_id', '=', company_id),
-        ]
+        # Leaves shared by the current and previous period domains
+        common = [_PAID, ('company_id', '=', company_id)]
         if pos_config_ids:
-            domain.append(('config_id', 'in', pos_config_ids))
+            common.append(('config_id', 'in', pos_config_ids))
+
+        domain = common + [
+            ('date_order', '>=', date_from),
+            ('date_order', '<', self._next_day(date_to)),
+        ]
 
         PosOrder = env['pos.order']
         current = self._aggregate_pos(PosOrder, domain, group_by)
@@ -83,23 +90,19 @@ class POSSummaryTool(BaseTool):
             prev_to = dt_from - timedelta(days=1)
             prev_from = prev_to - timedelta(days=period_days - 1)
 
-            prev_domain = [
-                ('state', 'in', ['paid', 'done', 'invoiced']),
-                ('date_order', '>=', prev_from.strftime('%Y-%m-%d') + ' 00:00:00'),
-                ('date_order', '<=', prev_to.strftime('%Y-%m-%d') + ' 23:59:59'),
-                ('company_id', '=', company_id),
+            prev_domain = common + [
+                ('date_order', '>=', prev_from.strftime('%Y-%m-%d')),
+                ('date_order', '<', date_from),
             ]
-            if pos_config_ids:
-                prev_domain.append(('config_id', 'in', pos_config_ids))
 
-            previous = self._aggregate_pos(PosOrder, prev_domain, group_by)
+            # Only the scalar summary is reported for the previous period
+            prev_s = self._aggregate_pos_summary(PosOrder, prev_domain)
             result['previous_period'] = {
                 'from': prev_from.strftime('%Y-%m-%d'),
                 'to': prev_to.strftime('%Y-%m-%d'),
-                'summary': previous['summary'],
+                'summary': prev_s,
             }
             cur_s = current['summary']
-            prev_s = previous['summary']
             result['deltas'] = {
                 'revenue': self._calculate_delta(cur_s['total_revenue'], prev_s['total_revenue']),
                 'transaction_count': self._calculate_delta(cur_s['transaction_count'], prev_s['transaction_count']),
@@ -110,65 +113,64 @@ class POSSummaryTool(BaseTool):
 
     def _aggregate_pos(self, PosOrder, domain, group_by):
         """Aggregate POS data."""
-        # Overall
-        agg = PosOrder.read_group(
-            domain,
-            fields=['amount_total:sum', 'id:count'],
-            groupby=[],
-        )
-        total_revenue = agg[0]['amount_total'] if agg else 0
-        count = agg[0]['__count'] if agg else 0
-        avg_ticket = total_revenue / count if count > 0 else 0
-
-        summary = {
-            'total_revenue': round(total_revenue or 0, 2),
-            'transaction_count': count,
-            'avg_ticket': round(avg_ticket, 2),
-        }
-
-        # By POS config
-        by_config_data = PosOrder.read_group(
-            domain,
-            fields=['amount_total:sum', 'id:count'],
-            groupby=['config_id'],
-            limit=50,
+        # Overall summary and time breakdown from one aggregate
+        total_revenue, count, series = self._totals_and_series(PosOrder, domain, group_by)
+        summary = self._pos_summary(total_revenue, count)
+
+        # By POS config: group on ids, then resolve names in one batched read
+        query = self._secure_query(PosOrder, domain)
+        config_col = SQL.identifier(query.table, 'config_id')
+        query.groupby = config_col
+        query.order = config_col
+        query.limit = 50
+        by_config_data = self._fetch_dicts(
+            PosOrder.env, query,
+            SQL('%s AS config_id', config_col),
+            SQL('COALESCE(SUM(%s), 0) AS revenue', SQL.identifier(query.table, 'amount_total')),
+            SQL('COUNT(*) AS count'),
         )
+        config_names = self._display_names(PosOrder.env['pos.config'].browse(
+            [row['config_id'] for row in by_config_data if row['config_id']]
+        ))
         by_config = []
         for row in by_config_data:
-            config_name = row.get('config_id', [None, 'Unknown'])
-            rev = row.get('amount_total', 0) or 0
-            cnt = row.get('__count', 0)
+            rev, cnt = row['revenue'], row['count']
             by_config.append({
-                'config_id': config_name[0] if isinstance(config_name, (list, tuple)) else None,
-                'config_name': config_name[1] if isinstance(config_name, (list, tuple)) else str(config_name),
+                'config_id': row['config_id'],
+                'config_name': config_names.get(row['config_id'], 'Unknown'),
                 'revenue': round(rev, 2),
                 'transaction_count': cnt,
                 'avg_ticket': round(rev / cnt, 2) if cnt > 0 else 0,
             })
 
         # Time breakdown
-        group_field = f'date_order:{group_by}'
-        breakdown_data = PosOrder.read_group(
-            domain,
-            fields=['amount_total:sum', 'id:count'],
-            groupby=[group_field],
-            orderby=group_field,
-            limit=self.max_rows,
-        )
-        breakdown = []
-        for row in breakdown_data:
-            period_label = row.get(group_field, 'Unknown')
-            rev = row.get('amount_total', 0) or 0
-            cnt = row.get('__count', 0)
-            breakdown.append({
+        breakdown = [
+            {
                 'period': period_label,
                 'revenue': round(rev, 2),
                 'transaction_count': cnt,
                 'avg_ticket': round(rev / cnt, 2) if cnt > 0 else 0,
-            })
+            }
+            for period_label, rev, cnt in series
+        ]
 
         return {
             'summary': summary,
             'by_config': by_config,
             'breakdown': breakdown,
         }
+
+    def _aggregate_pos_summary(self, PosOrder, domain):
+        """Return the overall revenue / count / average ticket for a domain."""
+        return self._pos_summary(*self._sum_and_count(PosOrder, domain))
+
+    @staticmethod
+    def _pos_summary(total_revenue, count):
+        """Shape revenue and transaction count into the summary dict."""
+        avg_ticket = total_revenue / count if count > 0 else 0
+
+        return {
+            'total_revenue': round(total_revenue, 2),
+            'transaction_count': count,
+            'avg_ticket': round(avg_ticket, 2),
+        }
@@ -2,11 +2,15 @@
 """Tool: get_pos_vs_online_summary — Compare POS vs Online sales side-by-side."""
 import logging
 
-from .base_tool import BaseTool
+from .base_tool import BaseTool, cached_analytic
 from .registry import register_tool
 
 _logger = logging.getLogger(__name__)
 
+# Static domain leaves, shared by every call
+_ONLINE_CONFIRMED = ('state', 'in', ('sale', 'done'))
+_POS_PAID = ('state', 'in', ('paid', 'done', 'invoiced'))
+
 
 @register_tool
 class POSvsOnlineTool(BaseTool):
@@ -36,63 +40,32 @@ class POSvsOnlineTool(BaseTool):
         'required': ['date_from', 'date_to'],
     }
 
+    @cached_analytic(tables=('sale_order', 'pos_order'), ttl=300)
     def execute(self, env, user, params):
         date_from = params['date_from']
         date_to = params['date_to']
         group_by = params.get('group_by', 'month')
         company_id = user.company_id.id
         currency = user.company_id.currency_id.name or 'USD'
+        date_to_next = self._next_day(date_to)
 
         # --- Online sales (sale.order) ---
-        online_domain = [
-            ('state', 'in', ['sale', 'done']),
+        date_leaves = [
             ('date_order', '>=', date_from),
-            ('date_order', '<=', date_to + ' 23:59:59'),
+            ('date_order', '<', date_to_next),
             ('company_id', '=', company_id),
         ]
+        online_domain = [_ONLINE_CONFIRMED, *date_leaves]
         SaleOrder = env['sale.order']
-        online_agg = SaleOrder.read_group(
-            online_domain,
-            fields=['amount_total:sum', 'id:count'],
-            groupby=[],
-        )
-        online_revenue = (online_agg[0]['amount_total'] or 0) if online_agg else 0
-        online_count = online_agg[0]['__count'] if online_agg else 0
-
-        # Online time series
-        group_field = f'date_order:{group_by}'
-        online_series = SaleOrder.read_group(
-            online_domain,
-            fields=['amount_total:sum', 'id:count'],
-            groupby=[group_field],
-            orderby=group_field,
-            limit=self.max_rows,
+        online_revenue, online_count, online_series = self._totals_and_series(
+            SaleOrder, online_domain, group_by,
         )
 
         # --- POS sales ---
-        pos_domain = [
-            ('state', 'in', ['paid', 'done', 'invoiced']),
-            ('date_order', '>=', date_from + ' 00:00:00'),
-            ('date_order', '<=', date_to + ' 23:59:59'),
-            ('company_id', '=', company_id),
-        ]
+        pos_domain = [_POS_PAID, *date_leaves]
         PosOrder = env['pos.order']
-        pos_agg = PosOrder.read_group(
-            pos_domain,
-            fields=['amount_total:sum', 'id:count'],
-            groupby=[],
-        )
-        pos_revenue = (pos_agg[0]['amount_total'] or 0) if pos_agg else 0
-        pos_count = pos_agg[0]['__count'] if pos_agg else 0
-
-        # POS time series
-        pos_group_field = f'date_order:{group_by}'
-        pos_series = PosOrder.read_group(
-            pos_domain,
-            fields=['amount_total:sum', 'id:count'],
-            groupby=[pos_group_field],
-            orderby=pos_group_field,
-            limit=self.max_rows,
+        pos_revenue, pos_count, pos_series = self._totals_and_series(
+            PosOrder, pos_domain, group_by,
         )
 
         # --- Combined totals ---
@@ -119,20 +92,12 @@ class POSvsOnlineTool(BaseTool):
             },
             'time_series': {
                 'online': [
-                    {
-                        'period': row.get(group_field, ''),
-                        'revenue': round(row.get('amount_total', 0) or 0, 2),
-                        'count': row.get('__count', 0),
-                    }
-                    for row in online_series
+                    {'period': period, 'revenue': round(rev, 2), 'count': cnt}
+                    for period, rev, cnt in online_series
                 ],
                 'pos': [
-                    {
-                        'period': row.get(pos_group_field, ''),
-                        'revenue': round(row.get('amount_total', 0) or 0, 2),
-                        'count': row.get('__count', 0),
-                    }
-                    for row in pos_series
+                    {'period': period, 'revenue': round(rev, 2), 'count': cnt}
+                    for period, rev, cnt in pos_series
                 ],
             },
             'currency': currency,
@@ -1,12 +1,23 @@
 # -*- coding: utf-8 -*-
 """Tool: get_refund_return_impact — Analyze refunds/returns and their impact on revenue."""
+import heapq
 import logging
 
-from .base_tool import BaseTool
+from odoo.tools import SQL
+
+from .base_tool import BaseTool, cached_analytic
 from .registry import register_tool
 
 _logger = logging.getLogger(__name__)
 
+# Static domain leaves, shared by every call
+_POSTED = ('state', '=', 'posted')
+_OUT_INVOICE = ('move_type', '=', 'out_invoice')
+_OUT_REFUND = ('move_type', '=', 'out_refund')
+_LINE_OUT_REFUND = ('move_id.move_type', '=', 'out_refund')
+_LINE_POSTED = ('move_id.state', '=', 'posted')
+_PRODUCT_LINE = ('display_type', '=', 'product')
+
 
 @register_tool
 class RefundReturnTool(BaseTool):
@@ -42,6 +53,7 @@ class RefundReturnTool(BaseTool):
         'required': ['date_from', 'date_to'],
     }
 
+    @cached_analytic(tables=('account_move',), ttl=300)
     def execute(self, env, user, params):
         date_from = params['date_from']
         date_to = params['date_to']
@@ -54,8 +66,8 @@ class RefundReturnTool(BaseTool):
 
         # --- Gross sales (out_invoice, posted) ---
         sales_domain = [
-            ('move_type', '=', 'out_invoice'),
-            ('state', '=', 'posted'),
+            _OUT_INVOICE,
+            _POSTED,
             ('invoice_date', '>=', date_from),
             ('invoice_date', '<=', date_to),
             ('company_id', '=', company_id),
@@ -70,8 +82,8 @@ class RefundReturnTool(BaseTool):
 
         # --- Credit notes / refunds (out_refund, posted) ---
         refund_domain = [
-            ('move_type', '=', 'out_refund'),
-            ('state', '=', 'posted'),
+            _OUT_REFUND,
+            _POSTED,
             ('invoice_date', '>=', date_from),
             ('invoice_date', '<=', date_to),
             ('company_id', '=', company_id),
@@ -93,49 +105,62 @@ class RefundReturnTool(BaseTool):
         # --- Breakdown by selected dimension ---
         AML = env['account.move.line']
         refund_line_domain = [
-            ('move_id.move_type', '=', 'out_refund'),
-            ('move_id.state', '=', 'posted'),
+            _LINE_OUT_REFUND,
+            _LINE_POSTED,
             ('move_id.invoice_date', '>=', date_from),
             ('move_id.invoice_date', '<=', date_to),
             ('move_id.company_id', '=', company_id),
-            ('display_type', '=', 'product'),
+            _PRODUCT_LINE,
         ]
 
-        if group_by == 'product':
-            orm_groupby = 'product_id'
-        elif group_by == 'month':
-            orm_groupby = 'move_id.invoice_date:month'
-        elif group_by == 'salesperson':
-            orm_groupby = 'move_id.invoice_user_id'
+        # ABS/ROUND run inside the aggregate; the query comes from _search so
+        # the user's record rules still apply.
+        query = self._secure_query(AML, refund_line_domain)
+        line = query.table
+        if group_by in ('month', 'salesperson'):
+            move = self._join(query, line, 'move_id', 'account_move', 'refund_move', kind='JOIN')
+            if group_by == 'month':
+                group_sql = SQL("date_trunc('month', %s)", SQL.identifier(move, 'invoice_date'))
+            else:
+                group_sql = SQL.identifier(move, 'invoice_user_id')
         else:
-            orm_groupby = 'product_id'
-
-        breakdown_data = AML.read_group(
-            refund_line_domain,
-            fields=['price_subtotal:sum', 'quantity:sum'],
-            groupby=[orm_groupby],
-            orderby='price_subtotal desc',
-            limit=limit,
+            group_sql = SQL.identifier(line, 'product_id')
+        query.groupby = group_sql
+
+        # Let Postgres stream the groups unsorted; the top-N is picked in
+        # Python, which avoids a sort (and possible spill) on large groupings.
+        breakdown_data = self._fetch_dicts(
+            env, query,
+            SQL('%s AS entity', group_sql),
+            SQL('ROUND(ABS(SUM(%s))::numeric, 2) AS amount', SQL.identifier(line, 'price_subtotal')),
+            SQL('ROUND(ABS(SUM(%s))::numeric, 2) AS qty', SQL.identifier(line, 'quantity')),
+        )
+        breakdown_data = heapq.nlargest(
+            limit, breakdown_data, key=lambda row: row['amount'] or 0,
         )
 
+        names = {}
+        entity_ids = {row['entity'] for row in breakdown_data if row['entity']}
+        if group_by == 'salesperson':
+            names = self._display_names(env['res.users'].browse(entity_ids))
+        elif group_by != 'month':
+            names = self._display_names(env['product.product'].browse(entity_ids))
+
         breakdown = []
         for row in breakdown_data:
-            entity = row.get(orm_groupby)
-            entity_name = 'Unknown'
-            if isinstance(entity, (list, tuple)) and len(entity) >= 2:
-                entity_name = entity[1]
-            elif isinstance(entity, str):
-                entity_name = entity
-            elif entity:
-                entity_name = str(entity)
-
-            amount = abs(round(row.get('price_subtotal', 0) or 0, 2))
-            qty = abs(round(row.get('quantity', 0) or 0, 2))
-
+            entity = row['entity']
+            if not entity:
+                entity_name = 'Unknown'
+            elif group_by == 'month':
+                entity_name = self._period_label(env, entity, 'month')
+            else:
+                entity_name = names.get(entity, 'Unknown')
+
+            amount = row['amount'] or 0
             breakdown.append({
                 'name': entity_name,
                 'refund_amount': amount,
-                'refund_quantity': qty,
+                'refund_quantity': row['qty'] or 0,
                 'pct_of_total_refunds': round(
                     (amount / refund_total * 100) if refund_total > 0 else 0, 1
                 ),
@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
-import re
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from odoo.exceptions import ValidationError
+from odoo.osv import expression
+from odoo.tools import SQL
 
+from . import config_cache
 from .base_tool import BaseTool
 from .registry import register_tool
 
@@ -34,21 +36,20 @@ class SalesByDimensionTool(BaseTool):
     def execute(self, env, user, params):
         # Use environment user-switch API compatible with this Odoo runtime.
         user_id = user.id if hasattr(user, 'id') else int(user)
-        env = env(user=user_id)
+        # Only aggregates and a few named columns are read: never prefetch
+        # whole records (the user's company fields included)
+        env = env(user=user_id, context=dict(env.context, prefetch_fields=False))
+        user = env.user
         date_from = params['date_from']
         date_to = params['date_to']
         dimension_codes = params.get('dimension_codes') or []
         filters = params.get('filters') or {}
 
-        self._validate_date_range(date_from, date_to)
+        start, end = self._validate_date_range(date_from, date_to)
 
-        Dimension = env['ai.analyst.dimension']
-        dims = Dimension.search([
-            ('is_active', '=', True),
-            ('code', 'in', dimension_codes),
-            '|', ('company_id', '=', False), ('company_id', 'in', user.company_ids.ids),
-        ])
-        dim_map = {d.code: d for d in dims}
+        # Dimension and synonym configuration comes from the process-wide cache
+        dims = config_cache.load_dimensions(env, user.company_ids.ids)
+        dim_map = {code: dims[code] for code in dimension_codes if code in dims}
         if any(code not in dim_map for code in dimension_codes):
             missing = [code for code in dimension_codes if code not in dim_map]
             raise ValidationError(f'Unknown or inactive dimension(s): {", ".join(missing)}')
@@ -57,45 +58,82 @@ class SalesByDimensionTool(BaseTool):
         domain = [
             ('order_id.state', 'in', ['sale', 'done']),
             ('order_id.company_id', '=', user.company_id.id),
-            ('order_id.date_order', '>=', f'{date_from} 00:00:00'),
-            ('order_id.date_order', '<=', f'{date_to} 23:59:59'),
+            ('order_id.date_order', '>=', start),
+            ('order_id.date_order', '<', end),
         ]
 
+        # Aggregate straight from the secured query; dimension paths become
+        # LEFT JOINs and filters plain conditions on the joined columns
+        query = self._secure_query(SaleLine, domain)
+        line = query.table
+
+        synonyms = config_cache.load_synonym_indexes(
+            env, [dim_map[code].id for code in filters if code in dim_map],
+        )
+
         resolved_filters = {}
         for code, raw in filters.items():
             dimension = dim_map.get(code)
             if not dimension:
                 continue
-            values = raw if isinstance(raw, list) else [raw]
+            index = synonyms[dimension.id]
+            # Resolve, drop empties and deduplicate in a single pass: several
+            # synonyms may share a canonical value, which is matched once
+            seen = set()
             canonical_values = []
-            for v in values:
-                canonical_values.append(self._resolve_synonym(env, dimension, str(v or '')))
-            canonical_values = [v for v in canonical_values if v]
+            for v in (raw if isinstance(raw, list) else (raw,)):
+                canonical = self._resolve_synonym(env, dimension, str(v or ''), synonyms=index)
+                if canonical and canonical not in seen:
+                    seen.add(canonical)
+                    canonical_values.append(canonical)
             if not canonical_values:
                 continue
-            domain += self._build_value_domain(dimension.field_name, canonical_values)
+            # Many2one dimensions are matched on the related record's name
+            field_sql, field = self._field_path_sql(
+                env, query, line, SaleLine._name, dimension.field_name, name_many2one=True,
+            )
+            if field.type == 'many2one':
+                # The comodel's name is not a column: name-search its records
+                matches = self._secure_query(env[field.comodel_name], expression.OR(
+                    [[('display_name', '=ilike', value)] for value in canonical_values]
+                ))
+                query.add_where(SQL('%s IN %s', field_sql, matches.subselect()))
+            else:
+                query.add_where(self._build_value_sql(field_sql, canonical_values))
             resolved_filters[code] = canonical_values
 
-        groupby = [dim_map[code].field_name for code in dimension_codes]
-        rg_fields = [f'{g}:count' for g in groupby] + ['price_subtotal:sum', 'product_uom_qty:sum']
-        rows = SaleLine.read_group(domain, rg_fields, groupby, lazy=False)
-
-        data = []
-        for row in rows:
-            dims_out = {}
-            for code in dimension_codes:
-                field_name = dim_map[code].field_name
-                value = row.get(field_name)
-                if isinstance(value, (tuple, list)) and len(value) >= 2:
-                    dims_out[code] = value[1]
-                else:
-                    dims_out[code] = value or 'Undefined'
-            data.append({
-                'dimensions': dims_out,
-                'sales': round(row.get('price_subtotal', 0.0) or 0.0, 2),
-                'quantity': round(row.get('product_uom_qty', 0.0) or 0.0, 2),
-                'line_count': row.get('__count', 0),
-            })
+        dim_fields = {}
+        dim_sqls = []
+        for i, code in enumerate(dimension_codes):
+            # Group many2ones by id: records sharing a name stay apart, and
+            # are labelled with their display_name below
+            dim_sql, dim_fields[f'dim_{i}'] = self._field_path_sql(
+                env, query, line, SaleLine._name, dim_map[code].field_name,
+            )
+            dim_sqls.append(dim_sql)
+        if dim_sqls:
+            query.groupby = SQL(', ').join(dim_sqls)
+            query.order = query.groupby
+        rows = self._fetch_dicts(
+            env, query,
+            *(SQL('%s AS %s', dim_sql, SQL.identifier(f'dim_{i}')) for i, dim_sql in enumerate(dim_sqls)),
+            SQL('COUNT(*) AS line_count'),
+            SQL('SUM(%s) AS sales', SQL.identifier(line, 'price_subtotal')),
+            SQL('SUM(%s) AS quantity', SQL.identifier(line, 'product_uom_qty')),
+        )
+        self._name_many2one_columns(env, rows, dim_fields)
+
+        data = [
+            {
+                'dimensions': {
+                    code: row[f'dim_{i}'] or 'Undefined' for i, code in enumerate(dimension_codes)
+                },
+                'sales': round(row['sales'] or 0.0, 2),
+                'quantity': round(row['quantity'] or 0.0, 2),
+                'line_count': row['line_count'],
+            }
+            for row in rows
+        ]
 
         return {
             'period': {'from': date_from, 'to': date_to},
@@ -104,45 +142,38 @@ class SalesByDimensionTool(BaseTool):
             'rows': data,
         }
 
-    def _resolve_synonym(self, env, dimension, value):
+    def _resolve_synonym(self, env, dimension, value, synonyms=None):
         value_l = (value or '').strip().lower()
         if not value_l:
             return ''
-        synonyms = env['ai.analyst.dimension.synonym'].search([
-            ('dimension_id', '=', dimension.id),
-            ('is_active', '=', True),
-        ], order='priority asc, id asc')
-        for s in synonyms:
-            term = (s.synonym or '').strip()
-            if not term:
-                continue
-            term_l = term.lower()
-            if s.match_type == 'exact' and value_l == term_l:
-                return s.canonical_value
-            if s.match_type == 'prefix' and value_l.startswith(term_l):
-                return s.canonical_value
-            if s.match_type == 'contains' and term_l in value_l:
-                return s.canonical_value
-            if s.match_type == 'regex' and re.search(term, value, flags=re.IGNORECASE):
-                return s.canonical_value
-        return value
-
-    def _build_value_domain(self, field_name, values):
-        if not values:
-            return []
-        if len(values) == 1:
-            return [(field_name, '=ilike', values[0])]
-        domain = []
-        for _ in range(len(values) - 1):
-            domain.append('|')
-        for value in values:
-            domain.append((field_name, '=ilike', value))
-        return domain
+        if synonyms is None:
+            synonyms = config_cache.load_synonym_indexes(env, [dimension.id])[dimension.id]
+        canonical = synonyms.lookup(value_l, value)
+        return value if canonical is None else canonical
+
+    def _build_value_sql(self, field_sql, values):
+        """Return a case-insensitive match of ``field_sql`` against ``values``.
+
+        Values without LIKE wildcards become a single ``lower(field) = ANY``
+        equality test; only the rest go through ``ILIKE ANY``.
+        """
+        plain = list(dict.fromkeys(v.lower() for v in values if not self._has_like_wildcard(v)))
+        wildcard = [v for v in values if self._has_like_wildcard(v)]
+        pieces = []
+        if plain:
+            pieces.append(SQL('lower(%s) = ANY(%s)', field_sql, plain))
+        if wildcard:
+            pieces.append(SQL('%s ILIKE ANY(%s)', field_sql, wildcard))
+        if len(pieces) == 1:
+            return pieces[0]
+        return SQL('(%s OR %s)', *pieces)
 
     def _validate_date_range(self, date_from, date_to):
-        start = datetime.strptime(date_from, '%Y-%m-%d').date()
-        end = datetime.strptime(date_to, '%Y-%m-%d').date()
+        """Validate the range and return it as half-open ``(start, end)`` datetimes."""
+        start = datetime.strptime(date_from, '%Y-%m-%d')
+        end = datetime.strptime(date_to, '%Y-%m-%d')
         if end < start:
             raise ValidationError('date_to must be greater than or equal to date_from.')
         if (end - start).days > 730:
             raise ValidationError('Date range cannot exceed 730 days.')
+        return start, end + timedelta(days=1)
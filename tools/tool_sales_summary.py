@@ -3,11 +3,14 @@
 import logging
 from datetime import datetime, timedelta
 
-from .base_tool import BaseTool
+from .base_tool import BaseTool, cached_analytic
 from .registry import register_tool
 
 _logger = logging.getLogger(__name__)
 
+# Static domain leaves, shared by every call
+_CONFIRMED = ('state', 'in', ('sale', 'done'))
+
 
 @register_tool
 class SalesSummaryTool(BaseTool):
@@ -46,6 +49,7 @@ class SalesSummaryTool(BaseTool):
         'required': ['date_from', 'date_to'],
     }
 
+    @cached_analytic(tables=('sale_order',), ttl=300)
     def execute(self, env, user, params):
         date_from = params['date_from']
         date_to = params['date_to']
@@ -54,12 +58,17 @@ class SalesSummaryTool(BaseTool):
         company_id = user.company_id.id
         currency = user.company_id.currency_id.name or 'USD'
 
+        # Parse the bounds once; the domains get datetimes, not strings
+        dt_from = datetime.strptime(date_from, '%Y-%m-%d')
+        dt_to = datetime.strptime(date_to, '%Y-%m-%d')
+
         # Build domain for confirmed sales
+        company_leaf = ('company_id', '=', company_id)
         domain = [
-            ('state', 'in', ['sale', 'done']),
-            ('date_order', '>=', date_from),
-            ('date_order', '<=', date_to + ' 23:59:59'),
-            ('company_id', '=', company_id),
+            _CONFIRMED,
+            ('date_order', '>=', dt_from),
+            ('date_order', '<', dt_to + timedelta(days=1)),
+            company_leaf,
         ]
 
         SaleOrder = env['sale.order']
@@ -75,17 +84,15 @@ class SalesSummaryTool(BaseTool):
 
         # Compare with previous period
         if compare:
-            dt_from = datetime.strptime(date_from, '%Y-%m-%d')
-            dt_to = datetime.strptime(date_to, '%Y-%m-%d')
             period_days = (dt_to - dt_from).days + 1
             prev_to = dt_from - timedelta(days=1)
             prev_from = prev_to - timedelta(days=period_days - 1)
 
             prev_domain = [
-                ('state', 'in', ['sale', 'done']),
-                ('date_order', '>=', prev_from.strftime('%Y-%m-%d')),
-                ('date_order', '<=', prev_to.strftime('%Y-%m-%d') + ' 23:59:59'),
-                ('company_id', '=', company_id),
+                _CONFIRMED,
+                ('date_order', '>=', prev_from),
+                ('date_order', '<', dt_from),
+                company_leaf,
             ]
             previous = self._aggregate_sales(SaleOrder, prev_domain, group_by)
             result['previous_period'] = {
@@ -108,15 +115,8 @@ class SalesSummaryTool(BaseTool):
 
     def _aggregate_sales(self, SaleOrder, domain, group_by):
         """Aggregate sales data for the given domain."""
-        # Overall summary
-        group_data = SaleOrder.read_group(
-            domain,
-            fields=['amount_total:sum', 'id:count'],
-            groupby=[],
-        )
-
-        total_revenue = group_data[0]['amount_total'] if group_data else 0
-        order_count = group_data[0]['__count'] if group_data else 0
+        # Overall summary and time breakdown from one aggregate
+        total_revenue, order_count, series = self._totals_and_series(SaleOrder, domain, group_by)
         avg_order_value = total_revenue / order_count if order_count > 0 else 0
 
         summary = {
@@ -126,26 +126,15 @@ class SalesSummaryTool(BaseTool):
         }
 
         # Time breakdown
-        group_field = f'date_order:{group_by}'
-        breakdown_data = SaleOrder.read_group(
-            domain,
-            fields=['amount_total:sum', 'id:count'],
-            groupby=[group_field],
-            orderby=group_field,
-            limit=self.max_rows,
-        )
-
-        breakdown = []
-        for row in breakdown_data:
-            period_label = row.get(group_field, 'Unknown')
-            rev = row.get('amount_total', 0) or 0
-            cnt = row.get('__count', 0)
-            breakdown.append({
+        breakdown = [
+            {
                 'period': period_label,
                 'revenue': round(rev, 2),
                 'order_count': cnt,
                 'avg_order_value': round(rev / cnt, 2) if cnt > 0 else 0,
-            })
+            }
+            for period_label, rev, cnt in series
+        ]
 
         return {
             'summary': summary,
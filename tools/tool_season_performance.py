@@ -1,12 +1,26 @@
 # -*- coding: utf-8 -*-
-from datetime import date, timedelta
+import functools
+import re
+from datetime import date, datetime, time, timedelta
 
 from odoo.exceptions import ValidationError
+from odoo.tools import SQL
 
+from . import config_cache
 from .base_tool import BaseTool
 from .registry import register_tool
 
 
+@functools.lru_cache(maxsize=1)
+def _season_window(today_ordinal):
+    """Return the half-open ``(start, end)`` datetimes of the two-year season window."""
+    today = date.fromordinal(today_ordinal)
+    return (
+        datetime.combine(today - timedelta(days=730), time.min),
+        datetime.combine(today + timedelta(days=1), time.min),
+    )
+
+
 @register_tool
 class SeasonPerformanceTool(BaseTool):
     name = 'get_season_performance'
@@ -28,103 +42,169 @@ class SeasonPerformanceTool(BaseTool):
     def execute(self, env, user, params):
         # Use environment user-switch API compatible with this Odoo runtime.
         user_id = user.id if hasattr(user, 'id') else int(user)
-        env = env(user=user_id)
+        # Only aggregates and a few named columns are read: never prefetch
+        # whole records (the user's company fields included)
+        env = env(user=user_id, context=dict(env.context, prefetch_fields=False))
+        user = env.user
         season_code = (params.get('season_code') or '').strip()
         compare_code = (params.get('compare_to_season') or '').strip()
         dimensions = params.get('dimensions') or []
 
-        Season = env['ai.analyst.season.config']
-        season = Season.search([
-            ('code', '=ilike', season_code),
-            ('is_active', '=', True),
-            '|', ('company_id', '=', False), ('company_id', 'in', user.company_ids.ids),
-        ], limit=1)
-        compare = Season.search([
-            ('code', '=ilike', compare_code),
-            ('is_active', '=', True),
-            '|', ('company_id', '=', False), ('company_id', 'in', user.company_ids.ids),
-        ], limit=1)
+        season, compare = self._load_seasons(env, user, season_code, compare_code)
         if not season or not compare:
             raise ValidationError('Season code not found in configuration.')
 
-        dim_map = {
-            d.code: d for d in env['ai.analyst.dimension'].search([
-                ('is_active', '=', True),
-                ('code', 'in', dimensions),
-                '|', ('company_id', '=', False), ('company_id', 'in', user.company_ids.ids),
-            ])
-        }
+        # Dimension configuration comes from the process-wide cache
+        all_dims = config_cache.load_dimensions(env, user.company_ids.ids)
+        dim_map = {code: all_dims[code] for code in dimensions if code in all_dims}
 
-        season_dimension = env['ai.analyst.dimension'].search([
-            ('code', '=', 'season'),
-            ('is_active', '=', True),
-            '|', ('company_id', '=', False), ('company_id', 'in', user.company_ids.ids),
-        ], limit=1)
+        season_dimension = all_dims.get('season')
         if not season_dimension:
             raise ValidationError('Season dimension configuration is missing.')
 
         field_name = season_dimension.field_name
+        window_start, window_end = _season_window(date.today().toordinal())
         base_domain = [
             ('order_id.state', 'in', ['sale', 'done']),
             ('order_id.company_id', '=', user.company_id.id),
-            ('order_id.date_order', '>=', f'{(date.today() - timedelta(days=730)).isoformat()} 00:00:00'),
-            ('order_id.date_order', '<=', f'{date.today().isoformat()} 23:59:59'),
+            ('order_id.date_order', '>=', window_start),
+            ('order_id.date_order', '<', window_end),
         ]
 
-        current_domain = base_domain + self._season_pattern_domain(season, field_name)
-        compare_domain = base_domain + self._season_pattern_domain(compare, field_name)
+        # Both seasons come out of one scan: each group is flagged with the
+        # season(s) it belongs to, so rows tagged for both count in both.
+        SaleLine = env['sale.order.line']
+        query = self._secure_query(SaleLine, base_domain)
+        line = query.table
+        season_products = self._season_product_ids(env, field_name, season, compare)
+        if season_products is not None:
+            # Tags live on the product: match the patterns once over products
+            # and let the line scan drive on sale_order_line.product_id
+            current_ids, compare_ids = season_products
+            product_sql = SQL.identifier(line, 'product_id')
+            in_current = SQL('%s = ANY(%s)', product_sql, current_ids)
+            in_compare = SQL('%s = ANY(%s)', product_sql, compare_ids)
+        else:
+            season_sql, _season_field = self._field_path_sql(
+                env, query, line, SaleLine._name, field_name,
+            )
+            in_current = self._season_pattern_sql(season, season_sql)
+            in_compare = self._season_pattern_sql(compare, season_sql)
+        query.add_where(SQL('(%s OR %s)', in_current, in_compare))
 
         groupby_fields = [dim_map[d].field_name for d in dimensions if d in dim_map]
-        fields = ['price_subtotal:sum', 'product_uom_qty:sum']
+        dim_fields = {}
+        dim_sqls = []
+        for path in groupby_fields:
+            # Group many2ones by id: records sharing a name stay apart, and
+            # are labelled with their display_name below
+            dim_sql, dim_fields[path] = self._field_path_sql(
+                env, query, line, SaleLine._name, path,
+            )
+            dim_sqls.append(dim_sql)
+
+        current_flag = SQL('COALESCE(%s, FALSE)', in_current)
+        compare_flag = SQL('COALESCE(%s, FALSE)', in_compare)
+        query.groupby = SQL(', ').join([current_flag, compare_flag, *dim_sqls])
+        rows = self._fetch_dicts(
+            env, query,
+            SQL('%s AS in_current', current_flag),
+            SQL('%s AS in_compare', compare_flag),
+            *(SQL('%s AS %s', dim_sql, SQL.identifier(f'dim_{i}')) for i, dim_sql in enumerate(dim_sqls)),
+            SQL('SUM(%s) AS price_subtotal', SQL.identifier(line, 'price_subtotal')),
+            SQL('SUM(%s) AS product_uom_qty', SQL.identifier(line, 'product_uom_qty')),
+        )
+        for row in rows:
+            for i, path in enumerate(groupby_fields):
+                row[path] = row.pop(f'dim_{i}')
+        self._name_many2one_columns(env, rows, dim_fields)
 
-        SaleLine = env['sale.order.line']
-        current = SaleLine.read_group(current_domain, fields, groupby_fields, lazy=False)
-        previous = SaleLine.read_group(compare_domain, fields, groupby_fields, lazy=False)
+        current = [row for row in rows if row['in_current']]
+        previous = [row for row in rows if row['in_compare']]
 
         return {
-            'season': season.code,
-            'compare_to': compare.code,
+            'season': season['code'],
+            'compare_to': compare['code'],
             'dimensions': dimensions,
             'current': self._shape(groupby_fields, current),
             'previous': self._shape(groupby_fields, previous),
         }
 
-    def _season_pattern_domain(self, season, field_name):
-        patterns = season.tag_pattern_ids.filtered(lambda p: p.is_active)
-        if not patterns:
-            return [(field_name, '=ilike', season.code)]
-
-        domain = []
+    def _season_product_ids(self, env, field_name, season, compare):
+        """Return ``(current_ids, compare_ids)`` of products tagged for each season.
+
+        Only applies when the season field path goes through ``product_id``;
+        returns ``None`` otherwise. Archived products are included since
+        past order lines still reference them.
+        """
+        prefix, _dot, product_path = field_name.partition('.')
+        if prefix != 'product_id' or not product_path:
+            return None
+        Product = env['product.product'].with_context(active_test=False)
+        query = self._secure_query(Product, [])
+        tag_sql, _field = self._field_path_sql(env, query, query.table, Product._name, product_path)
+        in_current = self._season_pattern_sql(season, tag_sql)
+        in_compare = self._season_pattern_sql(compare, tag_sql)
+        query.add_where(SQL('(%s OR %s)', in_current, in_compare))
+        rows = self._fetch_dicts(
+            env, query,
+            SQL.identifier(query.table, 'id'),
+            SQL('COALESCE(%s, FALSE) AS in_current', in_current),
+            SQL('COALESCE(%s, FALSE) AS in_compare', in_compare),
+        )
+        return (
+            [row['id'] for row in rows if row['in_current']],
+            [row['id'] for row in rows if row['in_compare']],
+        )
+
+    def _load_seasons(self, env, user, season_code, compare_code):
+        """Return the ``(season, compare)`` configs as dicts with their compiled patterns.
+
+        Both seasons come from one search; a code resolves to the first
+        season (in model order) whose code matches it as ``=ilike`` does.
+        """
+        Season = env['ai.analyst.season.config']
+        configs = Season.search_read([
+            '|', ('code', '=ilike', season_code), ('code', '=ilike', compare_code),
+            ('is_active', '=', True),
+            '|', ('company_id', '=', False), ('company_id', 'in', user.company_ids.ids),
+        ], ['code'])
+
+        def pick(code):
+            matcher = self._ilike_regex(code)
+            for config in configs:
+                if matcher.fullmatch(config['code']):
+                    exacts, ilikes = Season._compiled_tag_patterns(config['id'])
+                    return dict(config, exacts=exacts, ilikes=ilikes)
+            return None
+
+        return pick(season_code), pick(compare_code)
+
+    @staticmethod
+    def _ilike_regex(pattern):
+        """Compile an ``=ilike`` pattern to the equivalent case-insensitive regex."""
+        return re.compile(
+            ''.join('.*' if ch == '%' else '.' if ch == '_' else re.escape(ch) for ch in pattern),
+            re.IGNORECASE | re.DOTALL,
+        )
+
+    def _season_pattern_sql(self, season, field_sql):
+        """Return a SQL condition matching ``field_sql`` against the season's tag patterns."""
         pieces = []
-        for p in patterns:
-            if p.match_type == 'exact':
-                pieces.append((field_name, '=ilike', p.pattern))
-            elif p.match_type == 'prefix':
-                pieces.append((field_name, '=ilike', f'{p.pattern}%'))
-            elif p.match_type == 'contains':
-                pieces.append((field_name, 'ilike', p.pattern))
-            else:  # regex fallback: broad ilike guard
-                cleaned = ''.join(ch for ch in p.pattern if ch.isalnum())
-                pieces.append((field_name, 'ilike', cleaned or p.pattern))
-
-        for _ in range(len(pieces) - 1):
-            domain.append('|')
-        domain.extend(pieces)
-        return domain
+        if season['exacts']:
+            pieces.append(SQL('lower(%s) = ANY(%s)', field_sql, list(season['exacts'])))
+        if season['ilikes']:
+            pieces.append(SQL('%s ILIKE ANY(%s)', field_sql, list(season['ilikes'])))
+        return SQL('(%s)', SQL(' OR ').join(pieces))
 
     def _shape(self, groupby_fields, rows):
-        out = []
-        for row in rows:
-            dims = {}
-            for f in groupby_fields:
-                value = row.get(f)
-                if isinstance(value, (tuple, list)) and len(value) >= 2:
-                    dims[f] = value[1]
-                else:
-                    dims[f] = value or 'Undefined'
-            out.append({
-                'dimensions': dims,
-                'sales': round(row.get('price_subtotal', 0.0) or 0.0, 2),
-                'quantity': round(row.get('product_uom_qty', 0.0) or 0.0, 2),
-            })
-        return out
+        # Group values arrive as plain values (many2one names are resolved
+        # beforehand), so each row is a single dict build
+        return [
+            {
+                'dimensions': {f: row[f] or 'Undefined' for f in groupby_fields},
+                'sales': round(row['price_subtotal'] or 0.0, 2),
+                'quantity': round(row['product_uom_qty'] or 0.0, 2),
+            }
+            for row in rows
+        ]
@@ -1,13 +1,27 @@
 # -*- coding: utf-8 -*-
 """Tool: get_stock_aging — Identify slow-moving and aging stock."""
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
+
+from odoo.tools import SQL
 
 from .base_tool import BaseTool
 from .registry import register_tool
 
 _logger = logging.getLogger(__name__)
 
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+# Days-since-last-sale of never sold products: they rank as the oldest
+_NEVER_SOLD = 99999
+
+# Below this many rows the NumPy setup costs more than the Python loop
+_VECTORIZE_MIN_ROWS = 32
+
 
 @register_tool
 class StockAgingTool(BaseTool):
@@ -42,6 +56,11 @@ class StockAgingTool(BaseTool):
                 'enum': ['days_since_last_sale', 'valuation', 'qty_on_hand'],
                 'default': 'days_since_last_sale',
             },
+            'aged_stock_only': {
+                'type': 'boolean',
+                'description': 'Only count stock received before the threshold (ignore recent arrivals)',
+                'default': False,
+            },
         },
         'required': [],
     }
@@ -51,6 +70,7 @@ class StockAgingTool(BaseTool):
         warehouse_ids = params.get('warehouse_ids', [])
         limit = params.get('limit', 50)
         sort_by = params.get('sort_by', 'days_since_last_sale')
+        aged_stock_only = params.get('aged_stock_only', False)
         company_id = user.company_id.id
         currency = user.company_id.currency_id.name or 'USD'
 
@@ -58,7 +78,6 @@ class StockAgingTool(BaseTool):
         threshold_date = today - timedelta(days=days_threshold)
 
         # Get products with stock on hand
-        Quant = env['stock.quant']
         quant_domain = [
             ('company_id', '=', company_id),
             ('quantity', '>', 0),
@@ -66,97 +85,39 @@ class StockAgingTool(BaseTool):
         ]
         if warehouse_ids:
             quant_domain.append(('location_id.warehouse_id', 'in', warehouse_ids))
-
-        # Group by product to get total qty on hand
-        quant_data = Quant.read_group(
-            quant_domain,
-            fields=['quantity:sum', 'value:sum'],
-            groupby=['product_id'],
-            orderby='quantity desc',
-            limit=500,  # Get more than needed, will filter
+        cutoff = datetime.combine(threshold_date + timedelta(days=1), time.min)
+        if aged_stock_only:
+            # Quants received after the threshold cannot be aging stock
+            quant_domain.append(('in_date', '<', cutoff))
+
+        # Group by product to get total qty on hand; only products whose
+        # last sale (if any) is older than the threshold come back
+        quant_data = self._slow_moving_quants(env, company_id, quant_domain, cutoff)
+        # stock.quant.value is not stored: value on-hand at the product cost
+        product_ids = [row['product_id'] for row in quant_data]
+        costs = self._get_costs(env, product_ids, company_id)
+        order, quantities, valuations, days = self._ranked_columns(
+            quant_data, costs, today, sort_by, limit,
         )
+        names = self._display_names(env['product.product'].browse(
+            [product_ids[i] for i in order]
+        ))
 
-        # For each product, find the last sale date
-        SOLine = env['sale.order.line']
         rows = []
-
-        for quant_row in quant_data:
-            product = quant_row.get('product_id')
-            if not product or not isinstance(product, (list, tuple)):
-                continue
-
-            product_id = product[0]
-            product_name = product[1]
-            qty_on_hand = round(quant_row.get('quantity', 0) or 0, 2)
-            valuation = round(quant_row.get('value', 0) or 0, 2)
-
-            # Find last sale for this product
-            last_sale = SOLine.search_read(
-                [
-                    ('product_id', '=', product_id),
-                    ('order_id.state', 'in', ['sale', 'done']),
-                    ('order_id.company_id', '=', company_id),
-                ],
-                fields=['order_id.date_order'],
-                order='order_id desc',
-                limit=1,
-            )
-
-            if last_sale:
-                last_sale_date = last_sale[0].get('order_id', [None, None])
-                # Handle the date from the related field
-                last_orders = env['sale.order'].search_read(
-                    [
-                        ('order_line.product_id', '=', product_id),
-                        ('state', 'in', ['sale', 'done']),
-                        ('company_id', '=', company_id),
-                    ],
-                    fields=['date_order'],
-                    order='date_order desc',
-                    limit=1,
-                )
-                if last_orders and last_orders[0].get('date_order'):
-                    last_date = last_orders[0]['date_order'].date() if hasattr(
-                        last_orders[0]['date_order'], 'date'
-                    ) else datetime.strptime(
-                        str(last_orders[0]['date_order'])[:10], '%Y-%m-%d'
-                    ).date()
-                    days_since = (today - last_date).days
-                    last_date_str = last_date.isoformat()
-                else:
-                    days_since = 9999
-                    last_date_str = None
-            else:
-                days_since = 9999
-                last_date_str = None
-
-            # Only include if slower than threshold
-            if days_since >= days_threshold:
-                rows.append({
-                    'product_id': product_id,
-                    'product_name': product_name,
-                    'qty_on_hand': qty_on_hand,
-                    'valuation': valuation,
-                    'last_sale_date': last_date_str,
-                    'days_since_last_sale': days_since if days_since < 9999 else 'Never sold',
-                })
-
-        # Sort
-        def sort_key(r):
-            if sort_by == 'days_since_last_sale':
-                v = r.get('days_since_last_sale', 0)
-                return v if isinstance(v, int) else 99999
-            elif sort_by == 'valuation':
-                return -(r.get('valuation', 0))
-            elif sort_by == 'qty_on_hand':
-                return -(r.get('qty_on_hand', 0))
-            return 0
-
-        rows.sort(key=sort_key, reverse=(sort_by == 'days_since_last_sale'))
-        rows = rows[:limit]
-
-        total_valuation = sum(r.get('valuation', 0) for r in rows)
-        total_qty = sum(r.get('qty_on_hand', 0) for r in rows)
+        for i in order:
+            quant_row = quant_data[i]
+            last_date = quant_row['last_date']
+            rows.append({
+                'product_id': quant_row['product_id'],
+                'product_name': names.get(quant_row['product_id'], quant_row['product_id']),
+                'qty_on_hand': round(quantities[i], 2),
+                'valuation': round(valuations[i], 2),
+                'last_sale_date': last_date.date().isoformat() if last_date else None,
+                'days_since_last_sale': days[i] if last_date else 'Never sold',
+            })
+
+        total_valuation = sum(valuations[i] for i in order)
+        total_qty = sum(quantities[i] for i in order)
 
         return {
             'threshold_days': days_threshold,
@@ -168,3 +129,98 @@ class StockAgingTool(BaseTool):
             },
             'currency': currency,
         }
+
+    @staticmethod
+    def _ranked_columns(quant_data, costs, today, sort_by, limit):
+        """Return ``(order, quantities, valuations, days)`` for ``quant_data``.
+
+        ``order`` lists the indexes of the top ``limit`` rows by ``sort_by``,
+        largest first, ties kept in query order; the other columns are
+        per-row values, ``days`` being ``_NEVER_SOLD`` for products never
+        sold. Large result sets are computed in one vectorized NumPy pass
+        when NumPy is available. Either way values come back unrounded, as
+        Python floats: rows round them once, with ``round()``.
+        """
+        count = len(quant_data)
+        if HAS_NUMPY and count >= _VECTORIZE_MIN_ROWS:
+            qty = np.fromiter(
+                (row['quantity'] or 0.0 for row in quant_data), dtype=np.float64, count=count)
+            cost = np.fromiter(
+                (costs[row['product_id']] for row in quant_data),
+                dtype=np.float64, count=count)
+            valuation = qty * cost
+            last = np.array(
+                [row['last_date'] and row['last_date'].date() for row in quant_data],
+                dtype='datetime64[D]')
+            days = np.where(
+                np.isnat(last), _NEVER_SOLD,
+                (np.datetime64(today, 'D') - last).astype(np.int64))
+            keys = {'valuation': valuation, 'qty_on_hand': qty}.get(sort_by, days)
+            order = np.argsort(-keys, kind='stable')[:limit]
+            return order.tolist(), qty.tolist(), valuation.tolist(), days.tolist()
+
+        quantities = [row['quantity'] or 0.0 for row in quant_data]
+        valuations = [
+            qty * costs[row['product_id']]
+            for qty, row in zip(quantities, quant_data)
+        ]
+        days = [
+            (today - row['last_date'].date()).days if row['last_date'] else _NEVER_SOLD
+            for row in quant_data
+        ]
+        keys = {'valuation': valuations, 'qty_on_hand': quantities}.get(sort_by, days)
+        order = sorted(range(count), key=lambda i: -keys[i])[:limit]
+        return order, quantities, valuations, days
+
+    def _slow_moving_quants(self, env, company_id, quant_domain, cutoff):
+        """Return on-hand totals of the products not sold since ``cutoff``.
+
+        Quants are grouped by product and LEFT JOINed to each product's last
+        confirmed sale (computed for the quant products only), so the
+        slow-moving test runs in the same query: never-sold products (no
+        sale row) and products whose last sale is before ``cutoff`` are
+        kept. Rows are dicts with ``product_id``, ``quantity`` and
+        ``last_date`` (``None`` if never sold), largest quantity first, at
+        most 500.
+        """
+        Quant = env['stock.quant']
+        query = self._secure_query(Quant, quant_domain)
+        quant = query.table
+        product_sql = SQL.identifier(quant, 'product_id')
+
+        SOLine = env['sale.order.line']
+        sales = self._secure_query(SOLine, [
+            ('order_id.state', 'in', ['sale', 'done']),
+            ('order_id.company_id', '=', company_id),
+        ])
+        # Only the products in stock matter: semi-join the quant product set
+        # so the history of every other product is never aggregated
+        stocked = self._secure_query(Quant, quant_domain)
+        sales.add_where(SQL(
+            '%s IN %s', SQL.identifier(sales.table, 'product_id'),
+            stocked.subselect(SQL.identifier(stocked.table, 'product_id')),
+        ))
+        date_sql, _field = self._field_path_sql(
+            env, sales, sales.table, SOLine._name, 'order_id.date_order',
+        )
+        sales.groupby = SQL.identifier(sales.table, 'product_id')
+        last_sale = sales.select(
+            SQL('%s AS product_id', SQL.identifier(sales.table, 'product_id')),
+            SQL('MAX(%s) AS last_date', date_sql),
+        )
+        query.add_join('LEFT JOIN', 'last_sale', SQL('(%s)', last_sale), SQL(
+            '%s = %s', SQL.identifier('last_sale', 'product_id'), product_sql,
+        ))
+        last_date_sql = SQL.identifier('last_sale', 'last_date')
+
+        query.add_where(SQL('%s IS NOT NULL', product_sql))
+        query.add_where(SQL('(%s IS NULL OR %s < %s)', last_date_sql, last_date_sql, cutoff))
+        query.groupby = SQL('%s, %s', product_sql, last_date_sql)
+        query.order = SQL('SUM(%s) DESC', SQL.identifier(quant, 'quantity'))
+        query.limit = 500  # Get more than needed, sorted and cut below
+        return self._fetch_dicts(
+            env, query,
+            SQL('%s AS product_id', product_sql),
+            SQL('SUM(%s) AS quantity', SQL.identifier(quant, 'quantity')),
+            SQL('%s AS last_date', last_date_sql),
+        )
@@ -1,12 +1,63 @@
 # -*- coding: utf-8 -*-
 """Tool: get_top_sellers — Top products/salespersons/categories by revenue, quantity, or margin."""
+import heapq
 import logging
+from datetime import date, datetime, time, timedelta
+from operator import itemgetter
 
-from .base_tool import BaseTool
+from odoo.tools import SQL
+
+from .base_tool import BaseTool, cached_analytic
 from .registry import register_tool
 
 _logger = logging.getLogger(__name__)
 
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+# Below this many groups the NumPy setup costs more than the heap
+_VECTORIZE_MIN_ROWS = 200
+
+# Output columns of each ranking field, when only the metric is requested
+_METRIC_COLUMNS = {
+    'price_subtotal': ('revenue',),
+    'product_uom_qty': ('quantity',),
+    'margin': ('margin', 'margin_pct'),
+}
+
+# Order line group path of each ranking dimension; categ_id lives on the
+# template, so categories group on its column through product -> template
+_GROUPBY_FIELDS = {
+    'product': 'product_id',
+    'salesperson': 'salesman_id',
+    'category': 'product_id.product_tmpl_id.categ_id',
+}
+# Order line field ranking each metric (margin needs sale_margin)
+_SORT_FIELDS = {
+    'revenue': 'price_subtotal',
+    'quantity': 'product_uom_qty',
+    'margin': 'margin',
+}
+
+# Daily summary column of each ranking dimension and order line measure
+_SUMMARY_GROUPBY = {
+    'product': 'product_id',
+    'salesperson': 'salesman_id',
+    'category': 'categ_id',
+}
+_SUMMARY_MEASURES = {
+    'price_subtotal': 'revenue',
+    'product_uom_qty': 'quantity',
+}
+
+
+def _ranking_ttl(params):
+    """Cache rankings of strictly past ranges longer: late edits are rare."""
+    return 3600 if params['date_to'] < date.today().isoformat() else 300
+
 
 @register_tool
 class TopSellersTool(BaseTool):
@@ -46,106 +97,211 @@ class TopSellersTool(BaseTool):
                 'default': 20,
                 'description': 'Number of top results to return',
             },
+            'detail': {
+                'type': 'boolean',
+                'default': True,
+                'description': 'Also return the non-ranking metrics (revenue, quantity)',
+            },
+            'metrics': {
+                'type': 'array',
+                'items': {'type': 'string', 'enum': ['revenue', 'quantity', 'margin']},
+                'description': 'Rank by several metrics at once: one ranking per metric, '
+                               'from a single query (overrides metric)',
+            },
         },
         'required': ['date_from', 'date_to'],
     }
 
+    @cached_analytic(tables=('sale_order', 'sale_order_line'), ttl=_ranking_ttl)
     def execute(self, env, user, params):
         date_from = params['date_from']
         date_to = params['date_to']
         by = params.get('by', 'product')
         metric = params.get('metric', 'revenue')
         limit = params.get('limit', 20)
-        company_id = user.company_id.id
-        currency = user.company_id.currency_id.name or 'USD'
+        detail = params.get('detail', True)
+        metrics = [m for m in dict.fromkeys(params.get('metrics') or ()) if m in _SORT_FIELDS]
+        # The analytic cache is keyed on the user's company: rank that one
+        # (not env.company, which the context may switch) and traverse it once
+        company = user.company_id
+        company_id = company.id
+        currency = company.currency_id.name or 'USD'
 
         # Use sale.order.line for product/category, sale.order for salesperson
         SOLine = env['sale.order.line']
 
+        # Half-open [date_from, date_to + 1 day) range of native datetimes
+        dt_from = datetime.combine(date.fromisoformat(date_from), time.min)
+        dt_end = datetime.combine(date.fromisoformat(date_to) + timedelta(days=1), time.min)
+
+        # Drive the scan from the confirmed orders of the window (a range on
+        # sale_order.date_order), then reach their lines through order_id.
+        # The orders stay a secured subquery: no id list is materialized
+        orders = self._secure_query(env['sale.order'], [
+            ('state', 'in', ['sale', 'done']),
+            ('company_id', '=', company_id),
+            ('date_order', '>=', dt_from),
+            ('date_order', '<', dt_end),
+        ])
+        # state and company_id are also stored on the line itself (related
+        # to the order): filtering them there needs no join
         base_domain = [
-            ('order_id.state', 'in', ['sale', 'done']),
-            ('order_id.date_order', '>=', date_from),
-            ('order_id.date_order', '<=', date_to + ' 23:59:59'),
-            ('order_id.company_id', '=', company_id),
+            ('state', 'in', ['sale', 'done']),
+            ('company_id', '=', company_id),
+            ('order_id', 'in', orders),
         ]
 
-        # Determine groupby field and aggregation
-        if by == 'product':
-            groupby_field = 'product_id'
-        elif by == 'salesperson':
-            groupby_field = 'salesman_id'
-        elif by == 'category':
-            groupby_field = 'product_id.categ_id'
-        else:
-            groupby_field = 'product_id'
-
-        # Determine sort field
-        if metric == 'revenue':
-            agg_fields = ['price_subtotal:sum', 'product_uom_qty:sum']
-            sort_field = 'price_subtotal'
-        elif metric == 'quantity':
-            agg_fields = ['product_uom_qty:sum', 'price_subtotal:sum']
-            sort_field = 'product_uom_qty'
-        elif metric == 'margin':
-            agg_fields = ['price_subtotal:sum', 'product_uom_qty:sum']
-            # Margin requires purchase_price field (from sale_margin module)
-            try:
-                env['sale.order.line']._fields['margin']
-                agg_fields.append('margin:sum')
-                sort_field = 'margin'
-            except KeyError:
-                # sale_margin module not installed, fall back to revenue
-                sort_field = 'price_subtotal'
+        # Resolve the group path and the sort field of each requested ranking;
+        # direct callers may bypass the schema enums
+        if by not in _GROUPBY_FIELDS:
+            raise ValueError(f'Unsupported ranking dimension: "{by}".')
+        if metric not in _SORT_FIELDS:
+            raise ValueError(f'Unsupported ranking metric: "{metric}".')
+        groupby_field = _GROUPBY_FIELDS[by]
+        sort_fields = {m: _SORT_FIELDS[m] for m in metrics or [metric]}
+        if 'margin' in sort_fields.values() and not self._has_margin(env):
+            # sale_margin module not installed, fall back to revenue
+            sort_fields = {
+                m: 'price_subtotal' if field == 'margin' else field
+                for m, field in sort_fields.items()
+            }
+        with_margin = 'margin' in sort_fields.values()
+
+        # Rankings read the pre-aggregated daily summary when it is fresh for
+        # the range, and fall back to the order lines otherwise
+        if self._use_daily_summary(env, company_id, dt_from, dt_end):
+            Source = env['ai.analyst.sale.daily.summary']
+            domain = [
+                ('company_id', '=', company_id),
+                ('date', '>=', dt_from.date()),
+                ('date', '<', dt_end.date()),
+            ]
+            groupby_field = _SUMMARY_GROUPBY[by]
+            measures = _SUMMARY_MEASURES
         else:
-            sort_field = 'price_subtotal'
-            agg_fields = ['price_subtotal:sum', 'product_uom_qty:sum']
-
-        group_data = SOLine.read_group(
-            base_domain,
-            fields=agg_fields,
-            groupby=[groupby_field],
-            orderby=f'{sort_field} desc',
-            limit=limit,
+            Source, domain, measures = SOLine, base_domain, {}
+
+        # Sums, rounding and margin % all come out of one secured aggregate
+        query = self._secure_query(Source, domain)
+        line = query.table
+        entity_sql, entity_field = self._field_path_sql(
+            env, query, line, Source._name, groupby_field,
         )
 
-        rows = []
-        rank = 0
-        for row in group_data:
-            rank += 1
-            entity = row.get(groupby_field)
-            entity_name = 'Unknown'
-            entity_id = None
-
-            if isinstance(entity, (list, tuple)) and len(entity) >= 2:
-                entity_id = entity[0]
-                entity_name = entity[1]
-            elif entity:
-                entity_name = str(entity)
-
-            revenue = round(row.get('price_subtotal', 0) or 0, 2)
-            qty = round(row.get('product_uom_qty', 0) or 0, 2)
-            margin = round(row.get('margin', 0) or 0, 2) if 'margin' in row else None
-
-            entry = {
-                'rank': rank,
-                'id': entity_id,
-                'name': entity_name,
-                'revenue': revenue,
-                'quantity': qty,
+        def measure(fname):
+            return SQL.identifier(line, measures.get(fname, fname))
+
+        revenue_sql = SQL('SUM(%s)', measure('price_subtotal'))
+        columns = {
+            'revenue': SQL('ROUND(COALESCE(%s, 0)::numeric, 2)::float', revenue_sql),
+            'quantity': SQL('ROUND(COALESCE(SUM(%s), 0)::numeric, 2)::float',
+                            measure('product_uom_qty')),
+        }
+        if with_margin:
+            margin_sql = SQL('SUM(%s)', measure('margin'))
+            columns['margin'] = SQL('ROUND(COALESCE(%s, 0)::numeric, 2)::float', margin_sql)
+            columns['margin_pct'] = SQL(
+                'CASE WHEN %s > 0 THEN ROUND((%s / %s * 100)::numeric, 1)::float ELSE 0 END',
+                revenue_sql, margin_sql, revenue_sql,
+            )
+        if not detail:
+            # Only sum what the ranking metrics need
+            needed = {key for field in sort_fields.values() for key in _METRIC_COLUMNS[field]}
+            columns = {key: sql for key, sql in columns.items() if key in needed}
+        query.groupby = entity_sql
+        if not metrics:
+            sort_field = sort_fields[metric]
+            query.order = SQL('SUM(%s) DESC', measure(sort_field))
+            query.limit = limit
+        group_data = self._fetch_dicts(
+            env, query,
+            SQL('%s AS entity_id', entity_sql),
+            *(SQL('%s AS %s', sql, SQL.identifier(key)) for key, sql in columns.items()),
+        )
+        if not group_data:
+            # Nothing sold in the window: no names to read, no rows to shape
+            return self._result(params, metrics, {m: [] for m in sort_fields}, currency)
+
+        if metrics:
+            # Every ranking is cut from the same groups, without sorting them all
+            ranked = {
+                m: self._top_rows(group_data, _METRIC_COLUMNS[field][0], limit)
+                for m, field in sort_fields.items()
             }
-            if margin is not None:
-                entry['margin'] = margin
-                entry['margin_pct'] = round(
-                    (margin / revenue * 100) if revenue > 0 else 0, 1
-                )
-
-            rows.append(entry)
-
-        return {
-            'period': {'from': date_from, 'to': date_to},
-            'ranked_by': metric,
-            'dimension': by,
-            'data': rows,
-            'total_results': len(rows),
-            'currency': currency,
+        else:
+            ranked = {metric: group_data}
+
+        names = self._display_names(env[entity_field.comodel_name].browse(list({
+            row['entity_id']: None
+            for group_rows in ranked.values() for row in group_rows if row['entity_id']
+        })))
+        # Values arrive rounded from SQL: each row is a single dict build
+        keys = tuple(columns)
+        rankings = {
+            m: [
+                {
+                    'rank': rank,
+                    'id': row['entity_id'] or None,
+                    'name': names.get(row['entity_id'], 'Unknown'),
+                    **{key: row[key] for key in keys},
+                }
+                for rank, row in enumerate(group_rows, start=1)
+            ]
+            for m, group_rows in ranked.items()
         }
+        return self._result(params, metrics, rankings, currency)
+
+    @staticmethod
+    def _top_rows(group_data, key, limit):
+        """Return the ``limit`` rows of ``group_data`` with the largest ``key``.
+
+        Rows come largest first. Small lists go through a bounded heap (ties
+        in query order); large ones through a NumPy partial sort when NumPy
+        is available.
+        """
+        count = len(group_data)
+        if HAS_NUMPY and count >= _VECTORIZE_MIN_ROWS and limit < count:
+            values = np.fromiter((row[key] for row in group_data), dtype=np.float64, count=count)
+            top = np.argpartition(-values, limit - 1)[:limit]
+            top = top[np.lexsort((top, -values[top]))]
+            return [group_data[i] for i in top.tolist()]
+        return heapq.nlargest(limit, group_data, key=itemgetter(key))
+
+    @staticmethod
+    def _result(params, metrics, rankings, currency):
+        """Shape ``rankings`` (metric -> ranked rows) as the tool result.
+
+        A single ranking keeps the flat ``data`` layout; with ``metrics``,
+        each ranking is returned under ``rankings`` keyed by metric.
+        """
+        result = {
+            'period': {'from': params['date_from'], 'to': params['date_to']},
+            'ranked_by': metrics or params.get('metric', 'revenue'),
+            'dimension': params.get('by', 'product'),
+        }
+        if metrics:
+            result['rankings'] = {
+                m: {'data': rows, 'total_results': len(rows)}
+                for m, rows in rankings.items()
+            }
+        else:
+            rows = next(iter(rankings.values()))
+            result['data'] = rows
+            result['total_results'] = len(rows)
+        result['currency'] = currency
+        return result
+
+    @staticmethod
+    def _use_daily_summary(env, company_id, dt_from, dt_end):
+        """Return whether the ranking may be read from the daily sales summary.
+
+        The summary holds every confirmed line of the company, so it is only
+        used for users who may see all sales (order line record rules cannot
+        apply to it), and only when it is fresh for the range.
+        """
+        Summary = env['ai.analyst.sale.daily.summary']
+        return (
+            env.user.has_group('sales_team.group_sale_salesman_all_leads')
+            and Summary.check_access_rights('read', raise_exception=False)
+            and Summary.is_fresh(company_id, dt_from, dt_end)
+        )